@@ -1,24 +1,49 @@
+import hashlib
 import logging
 import re
-from collections import defaultdict
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from itertools import islice
 from datetime import datetime, timedelta
-import sqlite3
 import asyncio
-from typing import List, Set, Tuple
-from functools import lru_cache
+import csv
+import gzip
+import io
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import (
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultsButton,
+    InputTextMessageContent,
+    Message,
+)
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
     ContextTypes,
+    InlineQueryHandler,
     filters,
 )
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
+from telegram.helpers import escape_markdown
 
 from config import config
+from db_pool import AsyncDatabase, ConnectionManager, DatabaseWorker, WriteBehindBuffer
+from migrations import apply_migrations
+from outbound import BULK, OutboundScheduler
+from serving import PerUserUpdateProcessor, describe_mode, run_application
 
 # ---------------- LOGGING ----------------
 logging.basicConfig(
@@ -27,192 +52,1001 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ---------------- EMAIL VALIDATION ----------------
+class EmailValidator:
+    GMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@(gmail\.com|googlemail\.com)$', re.IGNORECASE)
+    
+    @staticmethod
+    def is_valid_gmail(email: str) -> bool:
+        """Check if email is a valid Gmail address."""
+        return bool(EmailValidator.GMAIL_REGEX.match(email.strip().lower()))
+    
+    @staticmethod
+    def extract_local_part(email: str) -> str:
+        """Extract local part from email (before @)."""
+        return email.split('@')[0].lower()
+    
+    @staticmethod
+    def canonical_address(email: str) -> str:
+        """
+        Canonical inbox for a Gmail address: lowercased, dots and +tag
+        removed, googlemail.com folded into gmail.com.
+        """
+        local_part, _, domain = email.strip().lower().rpartition('@')
+        local_part = local_part.partition('+')[0].replace('.', '')
+        if domain == 'googlemail.com':
+            domain = 'gmail.com'
+        return f"{local_part}@{domain}"
+
 # ---------------- DATABASE ----------------
 class Database:
     def __init__(self, db_path: str = config.DATABASE_FILE):
         self.db_path = db_path
+        self.pool = ConnectionManager(db_path, cached_statements=config.DB_STATEMENT_CACHE_SIZE)
         self.init_db()
     
     def init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    last_name TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS user_emails (
-                    user_id INTEGER,
-                    email TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (user_id, email),
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            """)
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS rate_limits (
-                    user_id INTEGER,
-                    command TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            """)
-            
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_rate_limits 
-                ON rate_limits(user_id, timestamp)
-            """)
-            
-            conn.commit()
-    
-    def add_user(self, user_id: int, username: str, first_name: str, last_name: str = ""):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO users (user_id, username, first_name, last_name)
-                VALUES (?, ?, ?, ?)
-            """, (user_id, username, first_name, last_name))
-            conn.commit()
-    
-    def add_email(self, user_id: int, email: str):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT OR IGNORE INTO user_emails (user_id, email)
-                VALUES (?, ?)
-            """, (user_id, email))
-            conn.commit()
-    
-    def log_request(self, user_id: int, command: str):
-        with sqlite3.connect(self.db_path) as conn:
-            # Clean old entries
-            conn.execute("""
-                DELETE FROM rate_limits 
-                WHERE timestamp < datetime('now', '-1 hour')
-            """)
-            
-            # Add new entry
-            conn.execute("""
-                INSERT INTO rate_limits (user_id, command)
-                VALUES (?, ?)
-            """, (user_id, command))
-            
-            conn.commit()
+        version = apply_migrations(self.pool.connection())
+        logger.info(f"Database schema at version {version}")
     
-    def get_request_count(self, user_id: int, minutes: int = 60) -> int:
-        with sqlite3.connect(self.db_path) as conn:
+    # Updates the profile in place so created_at survives, and skips unchanged rows
+    UPSERT_USER_SQL = """
+        INSERT INTO users (user_id, username, first_name, last_name)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = excluded.username,
+            first_name = excluded.first_name,
+            last_name = excluded.last_name
+        WHERE username IS NOT excluded.username
+           OR first_name IS NOT excluded.first_name
+           OR last_name IS NOT excluded.last_name
+    """
+    
+    def get_user_profile(self, user_id: int) -> Optional[Tuple[str, str, str]]:
+        """(username, first_name, last_name) as stored, or None for unknown users."""
+        with self.pool.transaction() as conn:
+            row = conn.execute("""
+                SELECT username, first_name, last_name FROM users WHERE user_id = ?
+            """, (user_id,)).fetchone()
+            return tuple(value or "" for value in row) if row else None
+    
+    # Spellings of the same inbox share one row, which keeps the latest spelling
+    UPSERT_EMAIL_SQL = """
+        INSERT INTO user_emails (user_id, email, canonical)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id, canonical) DO UPDATE SET email = excluded.email
+    """
+    
+    def add_emails(self, user_id: int, emails: List[str]):
+        """Store several emails for a user in one transaction."""
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                self.UPSERT_EMAIL_SQL,
+                [(user_id, email, EmailValidator.canonical_address(email)) for email in emails]
+            )
+    
+    def find_email_owners(self, canonical: str) -> List[Tuple[int, str, str, str]]:
+        """Return (user_id, email, username, created_at) for every stored copy of an inbox."""
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT e.user_id, e.email, COALESCE(u.username, ''), e.created_at
+                FROM user_emails e
+                LEFT JOIN users u ON u.user_id = e.user_id
+                WHERE e.canonical = ?
+                ORDER BY e.created_at
+            """, (canonical,))
+            return cursor.fetchall()
+    
+    def find_user_email(self, user_id: int, email_key: str) -> Optional[str]:
+        """Resolve a page cursor's inbox hash to the user's stored spelling of that inbox."""
+        with self.pool.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT COUNT(*) FROM rate_limits 
-                WHERE user_id = ? 
-                AND timestamp > datetime('now', ?)
-            """, (user_id, f'-{minutes} minutes'))
-            return cursor.fetchone()[0]
+                SELECT email, canonical FROM user_emails WHERE user_id = ?
+            """, (user_id,))
+            for email, canonical in cursor:
+                # Older cursors hashed the spelling rather than the canonical inbox
+                if email_key in (email_cursor_key(canonical), legacy_cursor_key(email)):
+                    return email
+        return None
+    
+    LOG_REQUEST_SQL = """
+        INSERT INTO rate_limit_buckets (user_id, minute, count)
+        VALUES (?, ?, 1)
+        ON CONFLICT (user_id, minute) DO UPDATE SET count = count + 1
+    """
+    
+    @staticmethod
+    def current_minute() -> int:
+        return int(time.time()) // 60
+    
+    def prune_rate_limits(self) -> int:
+        """Delete buckets older than an hour; returns the number removed."""
+        with self.pool.transaction() as conn:
+            cursor = conn.execute("""
+                DELETE FROM rate_limit_buckets WHERE minute <= ?
+            """, (self.current_minute() - 60,))
+            return cursor.rowcount
+    
+    def load_rate_limit_buckets(self) -> List[Tuple[int, int, int]]:
+        """(user_id, minute, count) for every bucket still inside the hourly window."""
+        with self.pool.transaction() as conn:
+            return conn.execute("""
+                SELECT user_id, minute, count FROM rate_limit_buckets WHERE minute > ?
+            """, (self.current_minute() - 60,)).fetchall()
 
 db = Database()
 
+# Handlers go through adb so SQLite is only touched on the worker thread
+db_worker = DatabaseWorker(max_queue=config.DB_WORKER_QUEUE_SIZE)
+adb = AsyncDatabase(db, db_worker)
+
+# Hot-path writes are coalesced and committed in periodic batches
+write_buffer = WriteBehindBuffer(
+    db.pool,
+    db_worker,
+    flush_interval=config.WRITE_BEHIND_INTERVAL_MS / 1000,
+    flush_rows=config.WRITE_BEHIND_FLUSH_ROWS,
+    max_rows=config.WRITE_BEHIND_MAX_PENDING,
+)
+
+class KnownUsers:
+    """
+    LRU map of user_id to a hash of the profile last written for that user.
+    
+    Filled lazily: a user missing from the map is looked up in SQLite once,
+    after which repeated /start calls with an unchanged profile are answered
+    from memory without touching the database.
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._hashes: "OrderedDict[int, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+    
+    @staticmethod
+    def profile_hash(username: str, first_name: str, last_name: str) -> bytes:
+        return hashlib.sha1("\x1f".join((username, first_name, last_name)).encode()).digest()
+    
+    def get(self, user_id: int) -> Optional[bytes]:
+        digest = self._hashes.get(user_id)
+        if digest is not None:
+            self._hashes.move_to_end(user_id)
+        return digest
+    
+    def put(self, user_id: int, digest: bytes):
+        self._hashes[user_id] = digest
+        self._hashes.move_to_end(user_id)
+        while len(self._hashes) > self.max_entries:
+            self._hashes.popitem(last=False)
+    
+    def forget(self, user_id: int, digest: bytes):
+        """Drop the entry if it still holds digest, e.g. because writing it failed."""
+        if self._hashes.get(user_id) == digest:
+            del self._hashes[user_id]
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._hashes),
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+        }
+
+known_users = KnownUsers(config.KNOWN_USERS_CACHE_SIZE)
+
+async def record_user(user_id: int, username: str, first_name: str, last_name: str = "") -> bool:
+    """
+    Upsert a user through the write buffer, only when the profile changed.
+    
+    Returns True if a write was queued.
+    """
+    digest = KnownUsers.profile_hash(username, first_name, last_name)
+    cached = known_users.get(user_id)
+    if cached is None:
+        stored = await adb.get_user_profile(user_id)
+        if stored is not None:
+            cached = KnownUsers.profile_hash(*stored)
+            known_users.put(user_id, cached)
+    
+    if cached == digest:
+        known_users.hits += 1
+        return False
+    
+    known_users.misses += 1
+    known_users.writes += 1
+    known_users.put(user_id, digest)
+    # If the row is dropped, the next call looks the user up again and rewrites it
+    await write_buffer.add(
+        Database.UPSERT_USER_SQL,
+        (user_id, username, first_name, last_name),
+        key=user_id,
+        on_failure=lambda: known_users.forget(user_id, digest),
+    )
+    return True
+
+async def record_email(user_id: int, email: str):
+    """Upsert an email through the write buffer, merged with other spellings of its inbox."""
+    canonical = EmailValidator.canonical_address(email)
+    await write_buffer.add(Database.UPSERT_EMAIL_SQL, (user_id, email, canonical), key=(user_id, canonical))
+
+async def record_request(user_id: int):
+    """Count a request in its minute bucket through the write buffer; the bucket is chosen now, not at flush time."""
+    await write_buffer.add(Database.LOG_REQUEST_SQL, (user_id, Database.current_minute()))
+
 # ---------------- RATE LIMITING ----------------
 class RateLimiter:
+    """
+    Sliding-window per-minute and per-hour limits, kept in memory.
+    
+    Each user has two deques of request timestamps, trimmed as they age
+    out of their window, so both checks are amortised O(1) and never touch
+    disk. Requests are persisted as minute buckets through the write-behind
+    buffer, and the windows are rebuilt from those buckets at startup.
+    """
+    
+    MINUTE = 60
+    HOUR = 3600
+    
+    def __init__(self, per_minute: int, per_hour: int):
+        self.per_minute = per_minute
+        self.per_hour = per_hour
+        self._minute: Dict[int, deque] = {}
+        self._hour: Dict[int, deque] = {}
+    
     @staticmethod
-    def check_limit(user_id: int) -> bool:
+    def _trim(window: deque, cutoff: float):
+        while window and window[0] <= cutoff:
+            window.popleft()
+    
+    def _windows(self, user_id: int, now: float) -> Tuple[deque, deque]:
+        minute = self._minute.setdefault(user_id, deque(maxlen=max(self.per_minute, 1)))
+        hour = self._hour.setdefault(user_id, deque(maxlen=max(self.per_hour, 1)))
+        self._trim(minute, now - self.MINUTE)
+        self._trim(hour, now - self.HOUR)
+        return minute, hour
+    
+    def check_limit(self, user_id: int) -> bool:
         """Check if user has exceeded rate limits."""
-        hourly = db.get_request_count(user_id, 60)
-        minute = db.get_request_count(user_id, 1)
+        minute, hour = self._windows(user_id, time.time())
         
-        if hourly >= config.RATE_LIMIT_PER_HOUR:
-            logger.warning(f"User {user_id} exceeded hourly limit: {hourly}")
+        if len(hour) >= self.per_hour:
+            logger.warning(f"User {user_id} exceeded hourly limit: {len(hour)}")
             return False
-        if minute >= config.RATE_LIMIT_PER_MINUTE:
-            logger.warning(f"User {user_id} exceeded minute limit: {minute}")
+        if len(minute) >= self.per_minute:
+            logger.warning(f"User {user_id} exceeded minute limit: {len(minute)}")
             return False
         return True
-
-# ---------------- EMAIL VALIDATION ----------------
-class EmailValidator:
-    GMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@(gmail\.com|googlemail\.com)$', re.IGNORECASE)
     
-    @staticmethod
-    def is_valid_gmail(email: str) -> bool:
-        """Check if email is a valid Gmail address."""
-        return bool(EmailValidator.GMAIL_REGEX.match(email.strip().lower()))
+    def record(self, user_id: int):
+        """Count one request against the user's windows."""
+        now = time.time()
+        minute, hour = self._windows(user_id, now)
+        minute.append(now)
+        hour.append(now)
     
-    @staticmethod
-    def extract_local_part(email: str) -> str:
-        """Extract local part from email (before @)."""
-        return email.split('@')[0].lower()
+    def prune(self) -> int:
+        """Forget users whose hourly window has emptied; returns how many were dropped."""
+        now = time.time()
+        idle = [user_id for user_id in self._hour if not self._windows(user_id, now)[1]]
+        for user_id in idle:
+            del self._minute[user_id]
+            del self._hour[user_id]
+        return len(idle)
+    
+    def restore(self, buckets: List[Tuple[int, int, int]]):
+        """Rebuild windows from (user_id, minute, count) buckets, dating hits to the bucket start."""
+        now = time.time()
+        for user_id, minute_key, count in sorted(buckets, key=lambda bucket: bucket[1]):
+            minute, hour = self._windows(user_id, now)
+            started = minute_key * 60
+            hour.extend([started] * count)
+            if started > now - self.MINUTE:
+                minute.extend([started] * count)
+
+rate_limiter = RateLimiter(config.RATE_LIMIT_PER_MINUTE, config.RATE_LIMIT_PER_HOUR)
+
+async def prune_rate_limits(context: ContextTypes.DEFAULT_TYPE):
+    """Drop expired rate-limit buckets and idle in-memory windows (job queue callback)."""
+    removed = await adb.prune_rate_limits()
+    idle = rate_limiter.prune()
+    logger.debug(f"Pruned {removed} rate-limit buckets and {idle} idle users")
 
 # ---------------- ALIAS GENERATOR ----------------
 class AliasGenerator:
+    COMMON_SUFFIXES = [
+        'news', 'shop', 'work', 'personal', 'temp', 'spam',
+        'signup', 'social', 'finance', 'travel', 'food',
+        'tech', 'health', 'education', 'entertainment'
+    ]
+    
     @staticmethod
-    def generate_all_possible_aliases(email: str) -> List[str]:
+    def _split_dot_base(local_part: str) -> Tuple[str, str]:
+        """Split local part into the dot-free name Gmail matches on and any +tag suffix."""
+        name, plus, tag = local_part.partition('+')
+        return name.replace('.', ''), plus + tag
+    
+    @staticmethod
+    def _apply_dot_mask(name: str, mask: int) -> str:
+        """Insert a dot after name[i] for every bit i set in mask."""
+        parts = []
+        for i, char in enumerate(name):
+            parts.append(char)
+            if mask >> i & 1:
+                parts.append('.')
+        return ''.join(parts)
+    
+    @staticmethod
+    def _dot_mask_of(local_part: str) -> Optional[int]:
+        """Return the dot mask local_part already uses, or None if its dots are not a valid placement."""
+        name = local_part.partition('+')[0]
+        mask = 0
+        position = -1
+        previous = '.'
+        for char in name:
+            if char == '.':
+                if previous == '.':
+                    return None
+                mask |= 1 << position
+            else:
+                position += 1
+            previous = char
+        if previous == '.':
+            return None
+        return mask
+    
+    @staticmethod
+    def count_dot_variants(local_part: str) -> int:
+        """Exact number of dot variants of local_part, excluding local_part itself."""
+        name, _ = AliasGenerator._split_dot_base(local_part)
+        if len(name) <= 1:
+            return 0
+        total = 1 << (len(name) - 1)
+        if AliasGenerator._dot_mask_of(local_part) is not None:
+            total -= 1
+        return total
+    
+    @staticmethod
+    def dot_variant_at(local_part: str, index: int) -> str:
         """
-        Generate all possible Gmail aliases:
-        1. Dot variations (e.m.a.i.l@gmail.com)
-        2. Plus aliases (email+anything@gmail.com)
-        3. Email name variations (if email contains words)
+        Return the index-th dot variant in canonical order in O(n).
+        
+        Ranks map straight onto bitmasks; the mask of local_part itself is
+        skipped by shifting every rank at or above it up by one.
         """
-        if not EmailValidator.is_valid_gmail(email):
+        total = AliasGenerator.count_dot_variants(local_part)
+        if index < 0:
+            index += total
+        if not 0 <= index < total:
+            raise IndexError(f"dot variant index {index} out of range for {total} variants")
+        
+        name, suffix = AliasGenerator._split_dot_base(local_part)
+        excluded = AliasGenerator._dot_mask_of(local_part)
+        mask = index + 1 if excluded is not None and index >= excluded else index
+        return AliasGenerator._apply_dot_mask(name, mask) + suffix
+    
+    @staticmethod
+    def dot_variant_rank(variant: str, local_part: str) -> Optional[int]:
+        """Inverse of dot_variant_at: position of variant among local_part's dot variants, or None."""
+        name, suffix = AliasGenerator._split_dot_base(local_part)
+        variant_name, variant_suffix = AliasGenerator._split_dot_base(variant)
+        if variant_name != name or variant_suffix != suffix:
+            return None
+        
+        mask = AliasGenerator._dot_mask_of(variant)
+        excluded = AliasGenerator._dot_mask_of(local_part)
+        if mask is None or mask == excluded:
+            return None
+        return mask - 1 if excluded is not None and mask > excluded else mask
+    
+    @staticmethod
+    def iter_dot_variants(local_part: str, limit: Optional[int] = None, start: int = 0) -> Iterator[str]:
+        """
+        Lazily yield dot variants of a local part.
+        
+        Each of the 2^(n-1) dot placements is a bitmask over the n-1 gaps
+        between characters; masks are walked in ascending order so the
+        output is canonical. The variant equal to local_part is skipped,
+        iteration begins at rank `start` and stops after `limit` results.
+        """
+        total = AliasGenerator.count_dot_variants(local_part)
+        stop = total if limit is None else min(total, start + limit)
+        
+        name, suffix = AliasGenerator._split_dot_base(local_part)
+        excluded = AliasGenerator._dot_mask_of(local_part)
+        for index in range(max(start, 0), stop):
+            mask = index + 1 if excluded is not None and index >= excluded else index
+            yield AliasGenerator._apply_dot_mask(name, mask) + suffix
+    
+    @staticmethod
+    def dot_variants_slice(local_part: str, start: int, stop: int) -> List[str]:
+        """Return dot variants with ranks in [start, stop) without generating earlier ones."""
+        return list(AliasGenerator.iter_dot_variants(local_part, max(stop - start, 0), start))
+    
+    @staticmethod
+    def plus_aliases(local_part: str, domain: str) -> List[str]:
+        """Plus aliases with common suffixes."""
+        return [f"{local_part}+{suffix}@{domain}" for suffix in AliasGenerator.COMMON_SUFFIXES]
+    
+    @staticmethod
+    def word_aliases(local_part: str, domain: str) -> List[str]:
+        """Combinations of the words found in the local part."""
+        words = re.findall(r'[a-zA-Z]+', local_part)
+        if len(words) < 2:
             return []
         
+        aliases = []
+        for i in range(len(words)):
+            for j in range(i + 1, len(words) + 1):
+                combo = ''.join(words[i:j])
+                if combo and combo != local_part:
+                    aliases.append(f"{combo}@{domain}")
+        return list(dict.fromkeys(aliases))
+    
+    @staticmethod
+    def numbered_aliases(local_part: str, domain: str) -> List[str]:
+        """Numbered variations (limited to reasonable amount)."""
+        aliases = []
+        for i in range(1, 11):  # 1-10
+            aliases.append(f"{local_part}{i}@{domain}")
+            aliases.append(f"{local_part}.{i}@{domain}")
+            aliases.append(f"{local_part}+{i}@{domain}")
+        return aliases
+    
+    @staticmethod
+    def category_page(email: str, category: str, offset: int, limit: int,
+                      all_aliases: Optional[List[str]] = None) -> Tuple[List[str], int]:
+        """
+        Return (aliases, total) for one page of a category.
+        
+        The dot category pages straight through the full variant space via
+        the rank API; "all" pages through all_aliases when given, otherwise
+        through the cached full alias list.
+        """
+        if not EmailValidator.is_valid_gmail(email):
+            return [], 0
+        
         local_part = EmailValidator.extract_local_part(email)
         domain = email.split('@')[1].lower()
-        aliases = set()
         
-        # 1. Dot variations (all possible dot placements)
-        def generate_dot_variations(s: str) -> Set[str]:
-            if len(s) <= 1:
-                return {s}
-            
-            variations = set()
-            # For each position where we can place a dot
-            for i in range(1, len(s)):
-                left = s[:i]
-                right = s[i:]
-                # Generate variations for left and right parts
-                for left_var in generate_dot_variations(left):
-                    for right_var in generate_dot_variations(right):
-                        variations.add(left_var + "." + right_var)
-            
-            variations.add(s)  # Original without dots
-            return variations
+        if category == 'dot':
+            total = AliasGenerator.count_dot_variants(local_part)
+            page = AliasGenerator.dot_variants_slice(local_part, offset, offset + limit)
+            return [f"{variation}@{domain}" for variation in page], total
+        
+        if category == 'all':
+            aliases = all_aliases if all_aliases is not None else get_cached_aliases(email)
+        elif category == 'plus':
+            aliases = AliasGenerator.plus_aliases(local_part, domain)
+        elif category == 'word':
+            aliases = AliasGenerator.word_aliases(local_part, domain)
+        elif category == 'num':
+            aliases = AliasGenerator.numbered_aliases(local_part, domain)
+        else:
+            return [], 0
+        return aliases[offset:offset + limit], len(aliases)
+    
+    @staticmethod
+    def iter_all_aliases(email: str) -> Iterator[str]:
+        """
+        Yield every alias in canonical category-then-index order.
+        
+        Categories are disjoint except word combinations, which can equal a
+        dot variant (john.doe -> johndoe); those are checked with the rank
+        API against the dot variants already emitted.
+        """
+        if not EmailValidator.is_valid_gmail(email):
+            return
+        
+        local_part = EmailValidator.extract_local_part(email)
+        domain = email.split('@')[1].lower()
         
-        # Generate dot variations
-        dot_variations = generate_dot_variations(local_part)
-        for variation in dot_variations:
-            if variation != local_part:  # Skip original
-                aliases.add(f"{variation}@{domain}")
+        # 1. Dot variations (bounded by MAX_DOT_VARIANTS)
+        dot_count = 0
+        for variation in AliasGenerator.iter_dot_variants(local_part, config.MAX_DOT_VARIANTS):
+            dot_count += 1
+            yield f"{variation}@{domain}"
         
         # 2. Plus aliases (with common suffixes)
-        common_suffixes = [
-            'news', 'shop', 'work', 'personal', 'temp', 'spam',
-            'signup', 'social', 'finance', 'travel', 'food',
-            'tech', 'health', 'education', 'entertainment'
-        ]
+        yield from AliasGenerator.plus_aliases(local_part, domain)
         
-        for suffix in common_suffixes:
-            aliases.add(f"{local_part}+{suffix}@{domain}")
+        # 3. Word combinations, skipping ones already emitted as dot variants
+        for alias in AliasGenerator.word_aliases(local_part, domain):
+            rank = AliasGenerator.dot_variant_rank(alias.rsplit('@', 1)[0], local_part)
+            if rank is None or rank >= dot_count:
+                yield alias
         
-        # 3. Extract words from local part and create variations
-        words = re.findall(r'[a-zA-Z]+', local_part)
-        if len(words) >= 2:
-            # Create combinations of words
-            for i in range(len(words)):
-                for j in range(i + 1, len(words) + 1):
-                    combo = ''.join(words[i:j])
-                    if combo and combo != local_part:
-                        aliases.add(f"{combo}@{domain}")
-        
-        # 4. Add numbered variations (limited to reasonable amount)
-        for i in range(1, 11):  # 1-10
-            aliases.add(f"{local_part}{i}@{domain}")
-            aliases.add(f"{local_part}.{i}@{domain}")
-            aliases.add(f"{local_part}+{i}@{domain}")
+        # 4. Numbered variations
+        yield from AliasGenerator.numbered_aliases(local_part, domain)
+    
+    @staticmethod
+    def count_all_aliases(email: str) -> int:
+        """len(generate_all_possible_aliases(email)), computed without generating the aliases."""
+        if not EmailValidator.is_valid_gmail(email):
+            return 0
+        
+        local_part = EmailValidator.extract_local_part(email)
+        domain = email.split('@')[1].lower()
+        dot_count = min(AliasGenerator.count_dot_variants(local_part), config.MAX_DOT_VARIANTS)
+        # Same de-duplication as iter_all_aliases
+        words = 0
+        for alias in AliasGenerator.word_aliases(local_part, domain):
+            rank = AliasGenerator.dot_variant_rank(alias.rsplit('@', 1)[0], local_part)
+            if rank is None or rank >= dot_count:
+                words += 1
+        total = (dot_count + len(AliasGenerator.COMMON_SUFFIXES) + words
+                 + len(AliasGenerator.numbered_aliases(local_part, domain)))
+        return min(total, config.MAX_ALIASES_PER_USER)
+    
+    @staticmethod
+    def generate_all_possible_aliases(email: str) -> List[str]:
+        """
+        Generate all possible Gmail aliases:
+        1. Dot variations (e.m.a.i.l@gmail.com)
+        2. Plus aliases (email+anything@gmail.com)
+        3. Email name variations (if email contains words)
+        4. Numbered variations (email1@gmail.com)
+        
+        Output is already in canonical order, so truncation is a prefix take.
+        """
+        return list(islice(AliasGenerator.iter_all_aliases(email), config.MAX_ALIASES_PER_USER))
+
+# ---------------- ALIAS CACHE ----------------
+class AliasCache:
+    """
+    Shared LRU cache of generated alias lists with a TTL.
+    
+    Entries are evicted least-recently-used first once either the entry
+    count or the estimated total size in bytes exceeds its bound.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, int, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    @staticmethod
+    def _estimate_size(aliases: List[str]) -> int:
+        return sys.getsizeof(aliases) + sum(sys.getsizeof(alias) for alias in aliases)
+    
+    def get(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            stored_at, size, aliases = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.total_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return aliases
+    
+    def put(self, key: str, aliases: List[str]):
+        size = self._estimate_size(aliases)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            
+            self._entries[key] = (time.monotonic(), size, aliases)
+            self.total_bytes += size
+            
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+alias_cache = AliasCache(
+    max_entries=config.ALIAS_CACHE_MAX_ENTRIES,
+    max_bytes=config.ALIAS_CACHE_MAX_BYTES,
+    ttl_seconds=config.ALIAS_CACHE_TTL_SECONDS,
+)
+
+def get_cached_aliases(email: str) -> List[str]:
+    """
+    Return generate_all_possible_aliases(email) through the shared cache.
+    
+    Entries are keyed on the lowercased local part and generated for
+    gmail.com; googlemail.com requests get the same list re-addressed.
+    """
+    if not EmailValidator.is_valid_gmail(email):
+        return []
+    
+    local_part = EmailValidator.extract_local_part(email)
+    domain = email.strip().split('@')[1].lower()
+    
+    aliases = alias_cache.get(local_part)
+    if aliases is None:
+        aliases = AliasGenerator.generate_all_possible_aliases(f"{local_part}@gmail.com")
+        alias_cache.put(local_part, aliases)
+    return readdress_aliases(aliases, domain)
+
+def readdress_aliases(aliases: List[str], domain: str) -> List[str]:
+    """Move cached gmail.com aliases onto the requested domain."""
+    if domain != 'gmail.com':
+        return [f"{alias.rsplit('@', 1)[0]}@{domain}" for alias in aliases]
+    return aliases
+
+# ---------------- BACKGROUND GENERATION ----------------
+class GenerationTimeout(Exception):
+    """Alias generation exceeded its time budget."""
+
+class GenerationCancelled(Exception):
+    """Alias generation was superseded by a newer request from the same user and source."""
+
+_generation_pool: Optional[ProcessPoolExecutor] = None
+# Keyed on (user_id, source) so inline typing never cancels a chat request
+_user_generations: Dict[Tuple[int, str], asyncio.Future] = {}
+
+def _get_generation_pool() -> ProcessPoolExecutor:
+    global _generation_pool
+    if _generation_pool is None:
+        _generation_pool = ProcessPoolExecutor(max_workers=config.GENERATION_WORKERS)
+    return _generation_pool
+
+def shutdown_generation_pool():
+    """Stop worker processes, dropping queued work; running jobs end within their CPU budget."""
+    global _generation_pool
+    if _generation_pool is not None:
+        _generation_pool.shutdown(wait=True, cancel_futures=True)
+        _generation_pool = None
+
+def _generate_with_budget(email: str, cpu_budget: float) -> List[str]:
+    """Worker entry point: generate aliases, giving up once the CPU budget is spent."""
+    started = time.process_time()
+    aliases = []
+    for alias in islice(AliasGenerator.iter_all_aliases(email), config.MAX_ALIASES_PER_USER):
+        aliases.append(alias)
+        if len(aliases) % 256 == 0 and time.process_time() - started > cpu_budget:
+            raise GenerationTimeout(f"CPU budget of {cpu_budget}s exceeded")
+    return aliases
+
+async def _generate_in_pool(user_id: int, email: str, source: str = 'chat') -> List[str]:
+    """Run generation in the process pool, cancelling the user's previous run from the same source."""
+    key = (user_id, source)
+    previous = _user_generations.get(key)
+    if previous is not None and not previous.done():
+        previous.cancel()
+    
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        _get_generation_pool(),
+        _generate_with_budget,
+        email,
+        config.GENERATION_CPU_BUDGET_SECONDS,
+    )
+    _user_generations[key] = future
+    
+    try:
+        return await asyncio.wait_for(future, config.GENERATION_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise GenerationTimeout(f"no result after {config.GENERATION_TIMEOUT_SECONDS}s") from None
+    except asyncio.CancelledError:
+        if future.cancelled() and _user_generations.get(key) is not future:
+            raise GenerationCancelled() from None
+        raise
+    finally:
+        if _user_generations.get(key) is future:
+            del _user_generations[key]
+
+async def generate_aliases_async(email: str, user_id: int, source: str = 'chat') -> List[str]:
+    """
+    Cached alias generation that never blocks the event loop for long.
+    
+    Short local parts are generated inline, where process IPC would cost
+    more than the work itself; longer ones go to the process pool.
+    """
+    if not EmailValidator.is_valid_gmail(email):
+        return []
+    
+    local_part = EmailValidator.extract_local_part(email)
+    domain = email.strip().split('@')[1].lower()
+    
+    aliases = alias_cache.get(local_part)
+    if aliases is None:
+        canonical = f"{local_part}@gmail.com"
+        if config.GENERATION_WORKERS <= 0 or len(local_part) <= config.INLINE_GENERATION_MAX_LENGTH:
+            aliases = AliasGenerator.generate_all_possible_aliases(canonical)
+        else:
+            aliases = await _generate_in_pool(user_id, canonical, source)
+        alias_cache.put(local_part, aliases)
+    return readdress_aliases(aliases, domain)
+
+async def generate_aliases_batch(
+    emails: List[str],
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Tuple[str, Optional[List[str]]]]:
+    """
+    Generate aliases for many emails at once, in input order.
+    
+    Cache misses are all submitted to the process pool up front so workers
+    stay busy; an email whose generation times out maps to None. `progress`
+    is called with (finished, total) as pool results come in.
+    """
+    loop = asyncio.get_running_loop()
+    pending = {}
+    for email in emails:
+        local_part = EmailValidator.extract_local_part(email)
+        if local_part in pending or alias_cache.get(local_part) is not None:
+            continue
+        canonical = f"{local_part}@gmail.com"
+        if config.GENERATION_WORKERS <= 0 or len(local_part) <= config.INLINE_GENERATION_MAX_LENGTH:
+            alias_cache.put(local_part, AliasGenerator.generate_all_possible_aliases(canonical))
+            continue
+        pending[local_part] = loop.run_in_executor(
+            _get_generation_pool(),
+            _generate_with_budget,
+            canonical,
+            config.GENERATION_CPU_BUDGET_SECONDS,
+        )
+    
+    generated = {}
+    deadline = loop.time() + config.GENERATION_TIMEOUT_SECONDS
+    for local_part, future in pending.items():
+        try:
+            generated[local_part] = await asyncio.wait_for(future, max(deadline - loop.time(), 0))
+            alias_cache.put(local_part, generated[local_part])
+        except (asyncio.TimeoutError, GenerationTimeout):
+            generated[local_part] = None
+        if progress is not None:
+            progress(len(generated), len(pending))
+    
+    results = []
+    for email in emails:
+        local_part = EmailValidator.extract_local_part(email)
+        aliases = generated[local_part] if local_part in generated else alias_cache.get(local_part)
+        if aliases is None and local_part not in generated:
+            # Evicted between generation and collection; regenerate inline
+            aliases = AliasGenerator.generate_all_possible_aliases(f"{local_part}@gmail.com")
+        domain = email.split('@')[1]
+        results.append((email, readdress_aliases(aliases, domain) if aliases is not None else None))
+    return results
+
+# ---------------- DOCUMENT DELIVERY ----------------
+def spool_document(write: Callable[[TextIO], None], filename: str) -> Tuple[IO[bytes], str]:
+    """
+    Build a document in a spooled temp file, gzipped when that is smaller.
+    
+    `write` streams text into the file, which rolls over to disk past
+    DOCUMENT_SPOOL_MAX_MEMORY; compression is a second streaming pass.
+    Returns (file, filename) rewound for send_document; the caller closes the file.
+    """
+    plain = tempfile.SpooledTemporaryFile(max_size=config.DOCUMENT_SPOOL_MAX_MEMORY)
+    try:
+        text_stream = io.TextIOWrapper(plain, encoding='utf-8', newline='')
+        write(text_stream)
+        text_stream.flush()
+        text_stream.detach()
+        size = plain.tell()
+        plain.seek(0)
         
-        return sorted(list(aliases))[:config.MAX_ALIASES_PER_USER]
+        if config.DOCUMENT_GZIP and size >= config.DOCUMENT_GZIP_MIN_BYTES:
+            packed = tempfile.SpooledTemporaryFile(max_size=config.DOCUMENT_SPOOL_MAX_MEMORY)
+            try:
+                with gzip.GzipFile(filename=filename, fileobj=packed, mode='wb', mtime=0) as gz:
+                    shutil.copyfileobj(plain, gz)
+            except BaseException:
+                packed.close()
+                raise
+            if packed.tell() < size:
+                packed.seek(0)
+                plain.close()
+                return packed, f"{filename}.gz"
+            packed.close()
+            plain.seek(0)
+        return plain, filename
+    except BaseException:
+        plain.close()
+        raise
+
+def write_alias_lines(aliases: Iterable[str]) -> Callable[[TextIO], None]:
+    """Writer for spool_document emitting one alias per line."""
+    def write(stream: TextIO):
+        for alias in aliases:
+            stream.write(alias)
+            stream.write("\n")
+    return write
+
+# ---------------- PROGRESS ----------------
+class ProgressMessage:
+    """
+    One status message per request, edited in place while work runs.
+    
+    Nothing is sent until the work has taken `interval` seconds, so cached
+    and inline requests still cost a single reply. After that the status is
+    edited at most once per interval, and finish() turns it into the final
+    result instead of sending another message.
+    """
+    
+    def __init__(self, message: Message, interval: float = config.PROGRESS_MIN_INTERVAL_SECONDS):
+        self.message = message
+        self.interval = interval
+        self.status: Optional[Message] = None
+        self.started = time.monotonic()
+        self._last_update = self.started
+        self._last_text: Optional[str] = None
+    
+    async def update(self, text: str, force: bool = False):
+        """Show text as the current status, unless the last update was too recent."""
+        now = time.monotonic()
+        if text == self._last_text or (not force and now - self._last_update < self.interval):
+            return
+        if self.status is None:
+            self.status = await self.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+        else:
+            await self.status.edit_text(text, parse_mode=ParseMode.MARKDOWN)
+        self._last_update = now
+        self._last_text = text
+    
+    async def track(self, work: Awaitable, describe: Callable[[float], str]):
+        """Await work, refreshing the status with describe(elapsed seconds) every interval."""
+        task = asyncio.ensure_future(work)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.interval)
+                if done:
+                    return task.result()
+                await self.update(describe(time.monotonic() - self.started))
+        finally:
+            if not task.done():
+                task.cancel()
+    
+    async def finish(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None):
+        """Replace the status with the final text, or reply with it if no status was sent."""
+        if self.status is None:
+            await self.message.reply_text(text, parse_mode=ParseMode.MARKDOWN, reply_markup=reply_markup)
+        else:
+            await self.status.edit_text(text, parse_mode=ParseMode.MARKDOWN, reply_markup=reply_markup)
+    
+    async def discard(self):
+        """Remove the status once the result went out as a separate document."""
+        if self.status is not None:
+            await self.status.delete()
+            self.status = None
+
+# ---------------- PAGINATION ----------------
+ALIAS_CATEGORIES = {
+    'all': "All",
+    'dot': "Dots",
+    'plus': "Plus",
+    'word': "Words",
+    'num': "Numbered",
+}
+
+def email_cursor_key(email: str) -> str:
+    """
+    Short stable hash of an email's canonical inbox, small enough for callback_data.
+    
+    Hashing the inbox rather than the spelling keeps old buttons working after
+    the user sends another spelling of the same address, which replaces the
+    stored one.
+    """
+    return legacy_cursor_key(EmailValidator.canonical_address(email))
+
+def legacy_cursor_key(email: str) -> str:
+    return hashlib.sha1(email.encode('utf-8')).hexdigest()[:12]
+
+def page_email(message: Optional[Message], stored: str) -> str:
+    """The spelling a page message was rendered for, if it is still the stored inbox."""
+    match = re.match(r'📧 Aliases for: (\S+)', message.text or '') if message else None
+    if match and EmailValidator.canonical_address(match.group(1)) == EmailValidator.canonical_address(stored):
+        return match.group(1)
+    return stored
+
+def encode_page_cursor(email: str, category: str, offset: int) -> str:
+    """Encode a page position into callback_data (max 64 bytes)."""
+    return f"pg:{email_cursor_key(email)}:{category}:{offset}"
+
+def decode_page_cursor(data: str) -> Optional[Tuple[str, str, int]]:
+    """Decode callback_data into (email_key, category, offset)."""
+    try:
+        prefix, email_key, category, offset = data.split(':')
+        offset = int(offset)
+    except ValueError:
+        return None
+    if prefix != 'pg' or category not in ALIAS_CATEGORIES or offset < 0:
+        return None
+    return email_key, category, offset
+
+def build_alias_page(email: str, category: str, offset: int,
+                     all_aliases: Optional[List[str]] = None) -> Tuple[str, InlineKeyboardMarkup]:
+    """Render one page of aliases with its navigation keyboard."""
+    page_size = config.ALIASES_PAGE_SIZE
+    aliases, total = AliasGenerator.category_page(email, category, offset, page_size, all_aliases)
+    
+    # Clamp stale cursors (e.g. after a config change) to the last page
+    if total and offset >= total:
+        offset = (total - 1) // page_size * page_size
+        aliases, total = AliasGenerator.category_page(email, category, offset, page_size, all_aliases)
+    
+    pages = max(1, -(-total // page_size))
+    page = offset // page_size + 1
+    body = "\n".join(aliases) if aliases else "No aliases in this category."
+    text = (
+        f"📧 *Aliases for:* `{email}`\n"
+        f"*{ALIAS_CATEGORIES[category]}* • Page {page}/{pages} • {total} aliases\n\n"
+        f"```\n{body}\n```"
+    )
+    
+    categories = [
+        InlineKeyboardButton(
+            f"• {label}" if key == category else label,
+            callback_data=encode_page_cursor(email, key, 0),
+        )
+        for key, label in ALIAS_CATEGORIES.items()
+    ]
+    
+    navigation = []
+    last_offset = (pages - 1) * page_size
+    if offset > 0:
+        navigation.append(InlineKeyboardButton("⏮", callback_data=encode_page_cursor(email, category, 0)))
+        navigation.append(InlineKeyboardButton("◀️ Prev", callback_data=encode_page_cursor(email, category, max(offset - page_size, 0))))
+    if offset < last_offset:
+        navigation.append(InlineKeyboardButton("Next ▶️", callback_data=encode_page_cursor(email, category, offset + page_size)))
+        navigation.append(InlineKeyboardButton("⏭", callback_data=encode_page_cursor(email, category, last_offset)))
+    
+    jumps = []
+    for step in (-100, -10, 10, 100):
+        target = offset + step * page_size
+        if 0 <= target <= last_offset:
+            label = f"⏪ {-step}" if step < 0 else f"{step} ⏩"
+            jumps.append(InlineKeyboardButton(label, callback_data=encode_page_cursor(email, category, target)))
+    
+    keyboard = [categories[:3], categories[3:]]
+    if navigation:
+        keyboard.append(navigation)
+    if jumps:
+        keyboard.append(jumps)
+    return text, InlineKeyboardMarkup(keyboard)
+
+# ---------------- OUTBOUND ----------------
+# Every Bot API request goes through this; bulk documents use rate_limit_args=BULK
+outbound = OutboundScheduler(
+    global_rate=config.OUTBOUND_GLOBAL_RATE,
+    chat_rate=config.OUTBOUND_CHAT_RATE,
+    chat_burst=config.OUTBOUND_CHAT_BURST,
+    group_per_minute=config.OUTBOUND_GROUP_PER_MINUTE,
+    max_retries=config.OUTBOUND_MAX_RETRIES,
+)
+
+# Handlers run concurrently across users, in order per user
+update_processor = PerUserUpdateProcessor(config.MAX_CONCURRENT_UPDATES)
 
 # ---------------- COMMAND HANDLERS ----------------
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -220,7 +1054,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     
     # Register user in database
-    db.add_user(
+    await record_user(
         user_id=user.id,
         username=user.username or "",
         first_name=user.first_name,
@@ -260,11 +1094,18 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /start - Start the bot
 /help - Show this help message
 /about - About this bot
+/whois <alias> - Find the inbox an alias delivers to
 
 *Usage:*
 Simply send your Gmail address (e.g., `john.doe@gmail.com`)
 The bot will generate all possible aliases.
 
+*Bulk:* Upload a .csv or .txt file of Gmail addresses
+to get one CSV file with aliases for all of them.
+
+*Inline:* Type the bot's @username and a Gmail address
+in any chat to pick an alias from the results.
+
 *What are Gmail aliases?*
 • `youremail+spam@gmail.com` → Plus addressing
 • `y.o.u.r.e.m.a.i.l@gmail.com` → Dot variations
@@ -300,13 +1141,94 @@ Both deliver to your main inbox without any setup!
     
     await update.message.reply_text(about_text, parse_mode=ParseMode.MARKDOWN)
 
+async def whois_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Resolve any alias to its canonical inbox and owning record."""
+    user = update.effective_user
+    if not context.args:
+        await update.message.reply_text(
+            "❌ Usage: `/whois alias@gmail.com`",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    alias = context.args[0].strip().lower()
+    if not EmailValidator.is_valid_gmail(alias):
+        await update.message.reply_text("❌ Please provide a valid Gmail address or alias.")
+        return
+    
+    canonical = EmailValidator.canonical_address(alias)
+    await write_buffer.flush()
+    owners = await adb.find_email_owners(canonical)
+    text = f"🔎 *Canonical inbox:* `{canonical}`\n\n"
+    
+    if user.id in config.ADMIN_USER_IDS:
+        if owners:
+            text += "*Stored by:*\n"
+            for owner_id, email, username, created_at in owners:
+                handle = f"@{escape_markdown(username)}" if username else str(owner_id)
+                text += f"• `{email}` — {handle} (`{owner_id}`), since {created_at}\n"
+        else:
+            text += "No user has stored this inbox."
+    else:
+        own = [email for owner_id, email, _, _ in owners if owner_id == user.id]
+        if own:
+            text += f"✅ This alias belongs to your address `{own[0]}`."
+        else:
+            text += "This inbox is not one of your saved addresses."
+    
+    await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show runtime statistics (admins only)."""
+    if update.effective_user.id not in config.ADMIN_USER_IDS:
+        return
+    
+    cache = alias_cache.stats()
+    users = known_users.stats()
+    database = db.pool.stats()
+    worker = db_worker.stats()
+    writes = write_buffer.stats()
+    sends = outbound.stats()
+    updates = update_processor.stats()
+    inline = inline_answers.stats()
+    stats_text = (
+        "📊 *Bot Statistics*\n\n"
+        "*Alias cache:*\n"
+        f"Entries: {cache['entries']} ({cache['bytes'] // 1024} KiB)\n"
+        f"Hits: {cache['hits']} • Misses: {cache['misses']}\n"
+        f"Evictions: {cache['evictions']} • Expired: {cache['expirations']}\n\n"
+        "*Known users:*\n"
+        f"Entries: {users['entries']} • Unchanged: {users['hits']} • Written: {users['writes']}\n\n"
+        f"*Generations in progress:* {len(_user_generations)}\n\n"
+        "*Database:*\n"
+        f"Connections opened: {database['connections_opened']}\n"
+        f"Transactions: {database['transactions']} • "
+        f"avg {database['avg_ms']:.2f} ms • max {database['max_ms']:.2f} ms\n"
+        f"Worker queue: {worker['depth']} (peak {worker['max_depth']}) • "
+        f"wait avg {worker['avg_wait_ms']:.2f} ms • max {worker['max_wait_ms']:.2f} ms\n"
+        f"Write-behind: {writes['pending']} pending • {writes['rows_flushed']} rows in {writes['flushes']} flushes • {writes['rows_failed']} dropped • "
+        f"flush avg {writes['avg_flush_ms']:.2f} ms • max {writes['max_flush_ms']:.2f} ms\n\n"
+        "*Outbound:*\n"
+        f"Queued: {sends['depth']} (interactive {sends['interactive']} • bulk {sends['bulk']} • peak {sends['max_depth']})\n"
+        f"Sent: {sends['sent']} • Flood retries: {sends['retries']} • Failed: {sends['failures']}\n"
+        f"Wait avg {sends['avg_wait_ms']:.0f} ms • max {sends['max_wait_ms']:.0f} ms\n\n"
+        "*Updates:*\n"
+        f"In flight: {updates['in_flight']}/{updates['max_concurrent']} (peak {updates['max_in_flight']}) • "
+        f"Queued behind same user: {updates['backlog']} (peak {updates['max_backlog']})\n"
+        f"Processed: {updates['processed']} • Wait avg {updates['avg_wait_ms']:.0f} ms • max {updates['max_wait_ms']:.0f} ms\n\n"
+        "*Inline queries:*\n"
+        f"Answered: {inline_counters['answered']} • Superseded: {inline_counters['superseded']}\n"
+        f"Cached pages: {inline['entries']} • Hits: {inline['hits']} • Misses: {inline['misses']}\n"
+    )
+    await update.message.reply_text(stats_text, parse_mode=ParseMode.MARKDOWN)
+
 async def handle_email(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle email input and generate aliases."""
     user = update.effective_user
     email = update.message.text.strip().lower()
     
     # Check rate limit
-    if not RateLimiter.check_limit(user.id):
+    if not rate_limiter.check_limit(user.id):
         await update.message.reply_text(
             "⏳ *Rate limit exceeded*\n\n"
             "Please wait a while before sending more requests.",
@@ -315,7 +1237,8 @@ async def handle_email(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Log the request
-    db.log_request(user.id, "generate_aliases")
+    rate_limiter.record(user.id)
+    await record_request(user.id)
     
     # Validate email
     if not EmailValidator.is_valid_gmail(email):
@@ -329,82 +1252,380 @@ async def handle_email(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Store email for user
-    db.add_email(user.id, email)
-    
-    # Generate aliases
-    await update.message.reply_text(
-        "⚡ *Generating all possible aliases...*\n"
-        "This may take a moment for longer email addresses.",
-        parse_mode=ParseMode.MARKDOWN
-    )
+    await record_email(user.id, email)
     
+    # Slow generations get one status message that is edited as they run and
+    # finally becomes the first page (which navigation edits in place); large
+    # sets are streamed from the generator into one document instead
+    progress = ProgressMessage(update.message)
     try:
-        aliases = AliasGenerator.generate_all_possible_aliases(email)
-        
-        if not aliases:
-            await update.message.reply_text(
-                "❌ *No aliases generated*\n\n"
-                "Could not generate aliases for this email.",
-                parse_mode=ParseMode.MARKDOWN
-            )
+        total = AliasGenerator.count_all_aliases(email)
+        if total > config.DOCUMENT_DELIVERY_THRESHOLD:
+            await send_aliases_document(update, email, total, progress)
             return
         
-        # Send in chunks (Telegram has 4096 character limit)
-        chunk_size = 3000
-        chunks = []
-        current_chunk = ""
-        
-        for alias in aliases:
-            if len(current_chunk) + len(alias) + 1 > chunk_size:
-                chunks.append(current_chunk)
-                current_chunk = alias + "\n"
-            else:
-                current_chunk += alias + "\n"
-        
-        if current_chunk:
-            chunks.append(current_chunk)
-        
-        # Send first chunk with header
-        header = f"📧 *Generated Aliases for:* `{email}`\n\n"
-        await update.message.reply_text(
-            header + chunks[0],
-            parse_mode=ParseMode.MARKDOWN
+        aliases = await progress.track(
+            generate_aliases_async(email, user.id),
+            lambda elapsed: f"⏳ *Generating aliases for* `{email}`…\n\n{elapsed:.0f}s elapsed",
         )
+        text, reply_markup = build_alias_page(email, 'all', 0, aliases)
+        await progress.finish(text, reply_markup)
         
-        # Send remaining chunks
-        for chunk in chunks[1:]:
-            await update.message.reply_text(
-                f"```\n{chunk}\n```",
-                parse_mode=ParseMode.MARKDOWN_V2
-            )
-        
-        # Send summary
-        summary = f"""
+    except GenerationCancelled:
+        logger.info(f"Generation for user {user.id} superseded by a newer request")
+        await progress.finish(
+            "⏹ *Request superseded*\n\n"
+            "A newer request replaced this one before it finished."
+        )
+    except GenerationTimeout as e:
+        logger.warning(f"Generation for user {user.id} timed out: {e}")
+        await progress.finish(
+            "⏳ *Generation took too long*\n\n"
+            "This address has too many variations to list right now. Please try again later."
+        )
+    except Exception as e:
+        logger.error(f"Error generating aliases: {e}")
+        await progress.finish(
+            "❌ *Error generating aliases*\n\n"
+            "An error occurred while generating aliases. Please try again."
+        )
+
+async def send_aliases_document(update: Update, email: str, total: int,
+                                progress: Optional[ProgressMessage] = None):
+    """
+    Send every alias of email as a single (possibly gzipped) text document.
+    
+    Aliases are written straight from the generator into the spooled file
+    on a worker thread, so the full list never exists as Python strings.
+    """
+    local_part = EmailValidator.extract_local_part(email)
+    aliases = islice(AliasGenerator.iter_all_aliases(email), config.MAX_ALIASES_PER_USER)
+    spooling = asyncio.to_thread(spool_document, write_alias_lines(aliases), f"aliases_{local_part}.txt")
+    if progress is not None:
+        document, filename = await progress.track(
+            spooling,
+            lambda elapsed: f"📄 *Writing {total} aliases to a document…*\n\n{elapsed:.0f}s elapsed",
+        )
+    else:
+        document, filename = await spooling
+    
+    summary = f"""
 ✅ *Generation Complete!*
 
-*Total aliases:* {len(aliases)}
+*Total aliases:* {total}
 *Original email:* `{email}`
 
-*How to use these aliases:*
-1. Use any alias when signing up for websites
-2. All emails sent to aliases will arrive in your main inbox
-3. Filter emails based on the alias used
-
+All emails sent to these aliases arrive in your main inbox.
 💡 *Tip:* Use `email+websitename@gmail.com` to track where spam comes from!
-        """
+    """
+    # PTB reads any file object into the upload body anyway, and trips over
+    # the None name of an in-memory spool, so hand it the bytes
+    with document:
+        await update.get_bot().send_document(
+            chat_id=update.effective_chat.id,
+            document=document.read(),
+            filename=filename,
+            caption=summary,
+            parse_mode=ParseMode.MARKDOWN,
+            rate_limit_args=BULK
+        )
+    if progress is not None:
+        await progress.discard()
+
+async def handle_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Edit an alias page in place from its stateless cursor."""
+    query = update.callback_query
+    cursor = decode_page_cursor(query.data)
+    if cursor is None:
+        await query.answer("❌ Invalid page")
+        return
+    
+    email_key, category, offset = cursor
+    email = await adb.find_user_email(query.from_user.id, email_key)
+    if email is None and write_buffer.stats()['pending']:
+        # The email may still be sitting in the write-behind buffer
+        await write_buffer.flush()
+        email = await adb.find_user_email(query.from_user.id, email_key)
+    if email is None:
+        await query.answer("❌ Email not found. Please send it again.", show_alert=True)
+        return
+    # Keep paging the spelling this message shows, even if a newer one is stored
+    email = page_email(query.message, email)
+    
+    aliases = None
+    if category == 'all':
+        try:
+            aliases = await generate_aliases_async(email, query.from_user.id)
+        except GenerationCancelled:
+            await query.answer("⏹ Superseded by a newer request.")
+            return
+        except GenerationTimeout:
+            await query.answer("⏳ Generation took too long, please try again later.", show_alert=True)
+            return
+    
+    text, reply_markup = build_alias_page(email, category, offset, aliases)
+    await query.answer()
+    try:
+        await query.edit_message_text(
+            text,
+            parse_mode=ParseMode.MARKDOWN,
+            reply_markup=reply_markup
+        )
+    except BadRequest as e:
+        # Tapping the active category or current page renders the same message
+        if 'message is not modified' not in str(e).lower():
+            raise
+
+# ---------------- INLINE MODE ----------------
+class InlineAnswerCache:
+    """
+    Short-lived LRU cache of answered inline pages, keyed on (query, offset).
+    
+    Telegram already caches answers for INLINE_CACHE_TIME, but only per
+    query text on its side; this catches the repeats that still reach the
+    bot, such as paging back or the same address typed by another user.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[InlineQueryResultArticle], str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple[str, int]) -> Optional[Tuple[List[InlineQueryResultArticle], str]]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+    
+    def put(self, key: Tuple[str, int], results: List[InlineQueryResultArticle], next_offset: str):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), results, next_offset)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+inline_answers = InlineAnswerCache(config.INLINE_RESULT_CACHE_MAX_ENTRIES, config.INLINE_RESULT_CACHE_SECONDS)
+# Newest inline query id per user; anything older is dropped unanswered
+_latest_inline_queries: Dict[int, str] = {}
+inline_counters: Dict[str, int] = defaultdict(int)
+
+def build_inline_page(aliases: List[str], offset: int) -> Tuple[List[InlineQueryResultArticle], str]:
+    """One page of inline results starting at offset, plus the next_offset ('' on the last page)."""
+    page = aliases[offset:offset + config.INLINE_PAGE_SIZE]
+    results = [
+        InlineQueryResultArticle(
+            id=str(index),
+            title=alias,
+            description=f"Alias {index + 1} of {len(aliases)}",
+            input_message_content=InputTextMessageContent(alias),
+        )
+        for index, alias in enumerate(page, start=offset)
+    ]
+    end = offset + len(page)
+    return results, str(end) if end < len(aliases) else ""
+
+async def allow_inline_request(query: InlineQuery) -> bool:
+    """Count a new inline lookup against the rate limit, answering the query if it is over."""
+    user_id = query.from_user.id
+    if not rate_limiter.check_limit(user_id):
+        await query.answer(
+            [],
+            cache_time=0,
+            is_personal=True,
+            button=InlineQueryResultsButton(text="⏳ Rate limit exceeded", start_parameter="inline"),
+        )
+        return False
+    rate_limiter.record(user_id)
+    await record_request(user_id)
+    return True
+
+async def handle_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Answer an inline query with one page of aliases for the typed address."""
+    query = update.inline_query
+    user = query.from_user
+    email = query.query.strip().lower()
+    try:
+        offset = max(int(query.offset or 0), 0)
+    except ValueError:
+        offset = 0
+    
+    _latest_inline_queries[user.id] = query.id
+    try:
+        # Paging through an answer already counted is free; cached first pages are not
+        cached = inline_answers.get((email, offset))
+        if cached is not None:
+            if offset == 0 and not await allow_inline_request(query):
+                return
+            results, next_offset = cached
+            await query.answer(results, cache_time=config.INLINE_CACHE_TIME, next_offset=next_offset)
+            inline_counters['answered'] += 1
+            return
+        
+        # Let the user finish typing: a newer query from them replaces this one
+        await asyncio.sleep(config.INLINE_DEBOUNCE_SECONDS)
+        if _latest_inline_queries.get(user.id) != query.id:
+            inline_counters['superseded'] += 1
+            return
+        
+        if not EmailValidator.is_valid_gmail(email):
+            await query.answer(
+                [],
+                cache_time=config.INLINE_CACHE_TIME,
+                button=InlineQueryResultsButton(text="Type a full Gmail address", start_parameter="inline"),
+            )
+            return
+        
+        if offset == 0 and not await allow_inline_request(query):
+            return
+        
+        # A newer inline generation for this user cancels this one
+        try:
+            aliases = await generate_aliases_async(email, user.id, source='inline')
+        except GenerationCancelled:
+            inline_counters['superseded'] += 1
+            return
+        except GenerationTimeout:
+            await query.answer(
+                [],
+                cache_time=0,
+                button=InlineQueryResultsButton(text="⏳ Too many variations, send it in chat", start_parameter="inline"),
+            )
+            return
+        if _latest_inline_queries.get(user.id) != query.id:
+            inline_counters['superseded'] += 1
+            return
         
+        results, next_offset = build_inline_page(aliases, offset)
+        inline_answers.put((email, offset), results, next_offset)
+        await query.answer(results, cache_time=config.INLINE_CACHE_TIME, next_offset=next_offset)
+        inline_counters['answered'] += 1
+    finally:
+        if _latest_inline_queries.get(user.id) == query.id:
+            del _latest_inline_queries[user.id]
+
+def parse_bulk_addresses(data: bytes) -> Tuple[List[str], int]:
+    """Split an uploaded CSV/TXT file into unique valid Gmail addresses and an invalid count."""
+    text = data.decode('utf-8', errors='replace')
+    emails = []
+    seen = set()
+    invalid = 0
+    for token in re.split(r'[\s,;]+', text):
+        token = token.strip().strip('"\'').lower()
+        if not token:
+            continue
+        if not EmailValidator.is_valid_gmail(token):
+            invalid += 1
+        elif token not in seen:
+            seen.add(token)
+            emails.append(token)
+    return emails, invalid
+
+async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Generate aliases for every Gmail address in an uploaded CSV/TXT file."""
+    user = update.effective_user
+    document = update.message.document
+    
+    # The whole batch counts as a single request
+    if not rate_limiter.check_limit(user.id):
         await update.message.reply_text(
-            summary,
+            "⏳ *Rate limit exceeded*\n\n"
+            "Please wait a while before sending more requests.",
             parse_mode=ParseMode.MARKDOWN
         )
-        
-    except Exception as e:
-        logger.error(f"Error generating aliases: {e}")
+        return
+    
+    rate_limiter.record(user.id)
+    await record_request(user.id)
+    
+    if document.file_size and document.file_size > config.BULK_MAX_FILE_BYTES:
         await update.message.reply_text(
-            "❌ *Error generating aliases*\n\n"
-            "An error occurred while generating aliases. Please try again.",
+            f"❌ *File too large*\n\nPlease upload at most {config.BULK_MAX_FILE_BYTES // 1024} KB.",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    telegram_file = await document.get_file()
+    data = await telegram_file.download_as_bytearray()
+    emails, invalid = parse_bulk_addresses(bytes(data))
+    
+    if not emails:
+        await update.message.reply_text(
+            "❌ *No valid Gmail addresses found*\n\n"
+            "Upload a .csv or .txt file with one address per line or cell.",
             parse_mode=ParseMode.MARKDOWN
         )
+        return
+    
+    skipped = max(len(emails) - config.BULK_MAX_ADDRESSES, 0)
+    emails = emails[:config.BULK_MAX_ADDRESSES]
+    await adb.add_emails(user.id, emails)
+    
+    progress = ProgressMessage(update.message)
+    finished = {'done': 0, 'total': 0}
+    
+    def on_progress(done: int, total: int):
+        finished.update(done=done, total=total)
+    
+    def describe(elapsed: float) -> str:
+        status = f"⏳ *Generating aliases for {len(emails)} addresses…*\n\n"
+        if finished['total']:
+            status += f"{finished['done']}/{finished['total']} generated • "
+        return status + f"{elapsed:.0f}s elapsed"
+    
+    try:
+        results = await progress.track(generate_aliases_batch(emails, on_progress), describe)
+    except Exception as e:
+        logger.error(f"Error generating bulk aliases: {e}")
+        await progress.finish(
+            "❌ *Error generating aliases*\n\n"
+            "An error occurred while generating aliases. Please try again."
+        )
+        return
+    
+    counts = {'aliases': 0, 'timed_out': 0}
+    
+    def write_rows(stream: TextIO):
+        writer = csv.writer(stream)
+        writer.writerow(['email', 'alias'])
+        for email, aliases in results:
+            if aliases is None:
+                counts['timed_out'] += 1
+                continue
+            writer.writerows((email, alias) for alias in aliases)
+            counts['aliases'] += len(aliases)
+    
+    # Writing and gzipping up to BULK_MAX_ADDRESSES lists must not block the event loop
+    document, filename = await asyncio.to_thread(
+        spool_document, write_rows, f"aliases_bulk_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+    )
+    
+    caption = f"✅ {counts['aliases']} aliases for {len(results) - counts['timed_out']} addresses"
+    if invalid:
+        caption += f"\n⚠️ {invalid} invalid entries skipped"
+    if skipped:
+        caption += f"\n⚠️ {skipped} addresses over the {config.BULK_MAX_ADDRESSES} limit skipped"
+    if counts['timed_out']:
+        caption += f"\n⏳ {counts['timed_out']} addresses took too long"
+    
+    with document:
+        await context.bot.send_document(
+            chat_id=update.effective_chat.id,
+            document=document.read(),
+            filename=filename,
+            caption=caption,
+            rate_limit_args=BULK
+        )
+    await progress.discard()
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle errors gracefully."""
@@ -420,16 +1641,56 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pass  # If we can't send message, just log the error
 
 # ---------------- MAIN ----------------
+async def post_init(application: Application):
+    """Restore persisted state and schedule background jobs."""
+    rate_limiter.restore(await adb.load_rate_limit_buckets())
+    application.job_queue.run_repeating(
+        prune_rate_limits,
+        interval=config.RATE_LIMIT_PRUNE_SECONDS,
+        first=config.RATE_LIMIT_PRUNE_SECONDS,
+    )
+
+async def post_shutdown(application: Application):
+    """Release background resources once the bot has stopped."""
+    shutdown_generation_pool()
+    await write_buffer.close()
+    db_worker.stop()
+    db.pool.close()
+
 def main():
     """Start the bot."""
     try:
         # Create application
-        application = Application.builder().token(config.BOT_TOKEN).build()
+        application = (
+            Application.builder()
+            .token(config.BOT_TOKEN)
+            .rate_limiter(outbound)
+            .concurrent_updates(update_processor)
+            .post_init(post_init)
+            .post_shutdown(post_shutdown)
+            .build()
+        )
         
         # Add command handlers
         application.add_handler(CommandHandler("start", start))
         application.add_handler(CommandHandler("help", help_command))
         application.add_handler(CommandHandler("about", about))
+        application.add_handler(CommandHandler("whois", whois_command))
+        application.add_handler(CommandHandler("stats", stats_command))
+        
+        # Add alias page navigation
+        application.add_handler(CallbackQueryHandler(handle_page_callback, pattern=r'^pg:'))
+        
+        # Add inline mode
+        application.add_handler(InlineQueryHandler(handle_inline_query))
+        
+        # Add bulk upload handler
+        application.add_handler(
+            MessageHandler(
+                filters.Document.FileExtension("csv") | filters.Document.FileExtension("txt"),
+                handle_document
+            )
+        )
         
         # Add message handler for emails
         application.add_handler(
@@ -446,9 +1707,10 @@ def main():
         print(f"Version: 2.0.0")
         print(f"Database: {config.DATABASE_FILE}")
         print(f"Rate limit: {config.RATE_LIMIT_PER_HOUR}/hour")
+        print(f"Updates: {describe_mode()}")
         print("="*50 + "\n")
         
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
+        run_application(application, allowed_updates=Update.ALL_TYPES)
         
     except Exception as e:
         logger.error(f"Failed to start bot: {e}")
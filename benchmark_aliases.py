@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for AliasGenerator
+
+Sweeps local-part lengths, measuring wall time, peak memory and alias
+counts per category, and checks the dot-variant space against 2^(n-1) - 1.
+Needs no bot token or network access.
+
+    python benchmark_aliases.py --output benchmark_results.json
+    python benchmark_aliases.py --baseline benchmark_results.json --output current.json --threshold 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# alias_bot loads config at import time; keep it offline and away from the real database
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', 'offline-benchmark')
+os.environ.setdefault('DATABASE_FILE', os.path.join(tempfile.mkdtemp(), 'benchmark.db'))
+
+from alias_bot import AliasGenerator, EmailValidator  # noqa: E402
+from config import config  # noqa: E402
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+EXHAUSTIVE_CHECK_MAX_LENGTH = 14
+RANK_SAMPLES = 64
+
+def make_local_part(length: int) -> str:
+    """Deterministic local part of the given length."""
+    return (ALPHABET * (length // len(ALPHABET) + 1))[:length]
+
+def check_dot_variants(local_part: str) -> list:
+    """Return a list of problems found in the dot-variant space of local_part."""
+    problems = []
+    name = local_part.replace('.', '')
+    expected = (1 << (len(name) - 1)) - 1 if len(name) > 1 else 0
+    total = AliasGenerator.count_dot_variants(local_part)
+    if total != expected:
+        problems.append(f"count {total} != 2^(n-1) - 1 = {expected}")
+
+    if len(name) <= EXHAUSTIVE_CHECK_MAX_LENGTH:
+        variants = list(AliasGenerator.iter_dot_variants(local_part))
+        if len(variants) != expected:
+            problems.append(f"enumerated {len(variants)} variants, expected {expected}")
+        if len(set(variants)) != len(variants):
+            problems.append("duplicate dot variants")
+        if local_part in variants:
+            problems.append("original local part listed as a variant")
+        if any(variant.replace('.', '') != name for variant in variants):
+            problems.append("variant does not reduce to the original name")
+
+    # Rank/unrank round trip on evenly spaced indices
+    step = max(total // RANK_SAMPLES, 1)
+    for index in range(0, total, step):
+        variant = AliasGenerator.dot_variant_at(local_part, index)
+        if AliasGenerator.dot_variant_rank(variant, local_part) != index:
+            problems.append(f"rank round trip failed at index {index}")
+            break
+    return problems
+
+def benchmark_length(length: int, repeat: int) -> dict:
+    """Benchmark generate_all_possible_aliases for one local-part length."""
+    local_part = make_local_part(length)
+    email = f"{local_part}@gmail.com"
+    domain = 'gmail.com'
+
+    timings = []
+    aliases = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        aliases = AliasGenerator.generate_all_possible_aliases(email)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    AliasGenerator.generate_all_possible_aliases(email)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    dot_space = AliasGenerator.count_dot_variants(local_part)
+    if dot_space:
+        AliasGenerator.dot_variant_at(local_part, dot_space // 2)
+    rank_time = time.perf_counter() - started
+
+    problems = check_dot_variants(local_part)
+
+    return {
+        'length': length,
+        'local_part': local_part,
+        'wall_time_s': min(timings),
+        'peak_bytes': peak_bytes,
+        'rank_lookup_s': rank_time,
+        'aliases_total': len(aliases),
+        'categories': {
+            'dot': min(dot_space, config.MAX_DOT_VARIANTS),
+            'plus': len(AliasGenerator.plus_aliases(local_part, domain)),
+            'word': len(AliasGenerator.word_aliases(local_part, domain)),
+            'numbered': len(AliasGenerator.numbered_aliases(local_part, domain)),
+        },
+        'dot_space': dot_space,
+        'dot_space_expected': (1 << (length - 1)) - 1 if length > 1 else 0,
+        'canonical': EmailValidator.canonical_address(email),
+        'problems': problems,
+    }
+
+def find_regressions(results: list, baseline: dict, threshold: float, min_time: float) -> list:
+    """Compare results with a baseline run; return human-readable regressions."""
+    previous = {entry['length']: entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        old = previous.get(entry['length'])
+        if old is None:
+            continue
+        if old['wall_time_s'] >= min_time and entry['wall_time_s'] > old['wall_time_s'] * (1 + threshold):
+            regressions.append(
+                f"length {entry['length']}: wall time {old['wall_time_s']:.6f}s -> {entry['wall_time_s']:.6f}s"
+            )
+        if entry['peak_bytes'] > old['peak_bytes'] * (1 + threshold):
+            regressions.append(
+                f"length {entry['length']}: peak memory {old['peak_bytes']} -> {entry['peak_bytes']} bytes"
+            )
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Gmail alias generation")
+    parser.add_argument('--min-length', type=int, default=1)
+    parser.add_argument('--max-length', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5, help="timing runs per length (best is kept)")
+    parser.add_argument('--output', default='benchmark_results.json', help="where to write JSON results")
+    parser.add_argument('--baseline', help="previous results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument('--min-time', type=float, default=0.001,
+                        help="ignore wall-time regressions for baselines faster than this")
+    args = parser.parse_args()
+
+    # Read the baseline up front; writing results over it would compare the run with itself
+    baseline = None
+    if args.baseline:
+        if os.path.realpath(args.baseline) == os.path.realpath(args.output):
+            parser.error("--output must differ from --baseline, or the baseline is overwritten")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = []
+    print(f"{'len':>4} {'time (ms)':>10} {'peak (KiB)':>11} {'aliases':>8} {'dot space':>12}")
+    for length in range(args.min_length, args.max_length + 1):
+        entry = benchmark_length(length, args.repeat)
+        results.append(entry)
+        print(
+            f"{length:>4} {entry['wall_time_s'] * 1000:>10.3f} {entry['peak_bytes'] / 1024:>11.1f} "
+            f"{entry['aliases_total']:>8} {entry['dot_space']:>12}"
+            + ("  ❌ " + "; ".join(entry['problems']) if entry['problems'] else "")
+        )
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'max_aliases_per_user': config.MAX_ALIASES_PER_USER,
+            'max_dot_variants': config.MAX_DOT_VARIANTS,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results written to {args.output}")
+
+    failed = False
+    if any(entry['problems'] for entry in results):
+        print("❌ Dot-variant correctness checks failed")
+        failed = True
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.threshold, args.min_time)
+        if regressions:
+            print(f"❌ Regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  • {regression}")
+            failed = True
+        else:
+            print(f"✅ No regressions beyond {args.threshold:.0%}")
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
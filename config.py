@@ -1,4 +1,5 @@
 import os
+import re
 from typing import List
 from dotenv import load_dotenv
 
@@ -22,8 +23,66 @@ class Config:
     
     # Optional with defaults
     DATABASE_FILE = get_optional_env('DATABASE_FILE', 'aliases.db')
+    DB_STATEMENT_CACHE_SIZE = int(get_optional_env('DB_STATEMENT_CACHE_SIZE', '128'))
+    DB_WORKER_QUEUE_SIZE = int(get_optional_env('DB_WORKER_QUEUE_SIZE', '1000'))
+    WRITE_BEHIND_INTERVAL_MS = int(get_optional_env('WRITE_BEHIND_INTERVAL_MS', '250'))
+    WRITE_BEHIND_FLUSH_ROWS = int(get_optional_env('WRITE_BEHIND_FLUSH_ROWS', '500'))
+    WRITE_BEHIND_MAX_PENDING = int(get_optional_env('WRITE_BEHIND_MAX_PENDING', '5000'))
+    KNOWN_USERS_CACHE_SIZE = int(get_optional_env('KNOWN_USERS_CACHE_SIZE', '10000'))
     MAX_ALIASES_PER_USER = int(get_optional_env('MAX_ALIASES_PER_USER', '1000'))
     MAX_DOT_VARIANTS = int(get_optional_env('MAX_DOT_VARIANTS', '100'))
+    ALIASES_PAGE_SIZE = int(get_optional_env('ALIASES_PAGE_SIZE', '25'))
+    
+    # Alias cache
+    ALIAS_CACHE_MAX_ENTRIES = int(get_optional_env('ALIAS_CACHE_MAX_ENTRIES', '1024'))
+    ALIAS_CACHE_MAX_BYTES = int(get_optional_env('ALIAS_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    ALIAS_CACHE_TTL_SECONDS = int(get_optional_env('ALIAS_CACHE_TTL_SECONDS', '3600'))
+    
+    # Background generation (0 workers generates everything inline)
+    GENERATION_WORKERS = int(get_optional_env('GENERATION_WORKERS', '2'))
+    GENERATION_TIMEOUT_SECONDS = float(get_optional_env('GENERATION_TIMEOUT_SECONDS', '10'))
+    GENERATION_CPU_BUDGET_SECONDS = float(get_optional_env('GENERATION_CPU_BUDGET_SECONDS', '5'))
+    INLINE_GENERATION_MAX_LENGTH = int(get_optional_env('INLINE_GENERATION_MAX_LENGTH', '16'))
+    
+    # Document delivery: lists longer than the threshold go out as one file. With the
+    # default MAX_DOT_VARIANTS an address has at most ~150 aliases, so this only
+    # applies once MAX_DOT_VARIANTS / MAX_ALIASES_PER_USER are raised
+    DOCUMENT_DELIVERY_THRESHOLD = int(get_optional_env('DOCUMENT_DELIVERY_THRESHOLD', '300'))
+    DOCUMENT_SPOOL_MAX_MEMORY = int(get_optional_env('DOCUMENT_SPOOL_MAX_MEMORY', str(1024 * 1024)))
+    DOCUMENT_GZIP = get_optional_env('DOCUMENT_GZIP', 'true').lower() in ('1', 'true', 'yes')
+    DOCUMENT_GZIP_MIN_BYTES = int(get_optional_env('DOCUMENT_GZIP_MIN_BYTES', '4096'))
+    EXPORT_PAGE_SIZE = int(get_optional_env('EXPORT_PAGE_SIZE', '500'))
+    
+    # Progress messages: first status after this long, then at most one edit per interval
+    PROGRESS_MIN_INTERVAL_SECONDS = float(get_optional_env('PROGRESS_MIN_INTERVAL_SECONDS', '2'))
+    
+    # Inline mode: Telegram caches answers for INLINE_CACHE_TIME, the bot for INLINE_RESULT_CACHE_SECONDS
+    INLINE_PAGE_SIZE = int(get_optional_env('INLINE_PAGE_SIZE', '50'))
+    INLINE_CACHE_TIME = int(get_optional_env('INLINE_CACHE_TIME', '300'))
+    INLINE_RESULT_CACHE_SECONDS = float(get_optional_env('INLINE_RESULT_CACHE_SECONDS', '60'))
+    INLINE_RESULT_CACHE_MAX_ENTRIES = int(get_optional_env('INLINE_RESULT_CACHE_MAX_ENTRIES', '2048'))
+    INLINE_DEBOUNCE_SECONDS = float(get_optional_env('INLINE_DEBOUNCE_SECONDS', '0.3'))
+    
+    # Outbound messages (Telegram allows ~30 msg/s overall, ~1 msg/s per chat, 20 msg/min per group)
+    OUTBOUND_GLOBAL_RATE = float(get_optional_env('OUTBOUND_GLOBAL_RATE', '30'))
+    OUTBOUND_CHAT_RATE = float(get_optional_env('OUTBOUND_CHAT_RATE', '1'))
+    OUTBOUND_CHAT_BURST = float(get_optional_env('OUTBOUND_CHAT_BURST', '3'))
+    OUTBOUND_GROUP_PER_MINUTE = float(get_optional_env('OUTBOUND_GROUP_PER_MINUTE', '20'))
+    OUTBOUND_MAX_RETRIES = int(get_optional_env('OUTBOUND_MAX_RETRIES', '3'))
+    
+    # Update delivery: 'polling', or 'webhook' with a built-in HTTP listener
+    BOT_MODE = get_optional_env('BOT_MODE', 'polling').strip().lower()
+    WEBHOOK_URL = get_optional_env('WEBHOOK_URL', '')  # public base URL, e.g. https://bot.example.com
+    WEBHOOK_LISTEN = get_optional_env('WEBHOOK_LISTEN', '0.0.0.0')
+    WEBHOOK_PORT = int(get_optional_env('WEBHOOK_PORT', '8443'))
+    WEBHOOK_PATH = get_optional_env('WEBHOOK_PATH', 'telegram')
+    WEBHOOK_SECRET_TOKEN = get_optional_env('WEBHOOK_SECRET_TOKEN', '')
+    WEBHOOK_MAX_CONNECTIONS = int(get_optional_env('WEBHOOK_MAX_CONNECTIONS', '40'))
+    MAX_CONCURRENT_UPDATES = int(get_optional_env('MAX_CONCURRENT_UPDATES', '32'))
+    
+    # Bulk uploads
+    BULK_MAX_FILE_BYTES = int(get_optional_env('BULK_MAX_FILE_BYTES', str(512 * 1024)))
+    BULK_MAX_ADDRESSES = int(get_optional_env('BULK_MAX_ADDRESSES', '200'))
     
     # Admin IDs (comma separated)
     admin_ids = get_optional_env('ADMIN_USER_IDS', '').strip()
@@ -32,6 +91,14 @@ class Config:
     # Rate limiting
     RATE_LIMIT_PER_MINUTE = int(get_optional_env('RATE_LIMIT_PER_MINUTE', '30'))
     RATE_LIMIT_PER_HOUR = int(get_optional_env('RATE_LIMIT_PER_HOUR', '200'))
+    RATE_LIMIT_PRUNE_SECONDS = int(get_optional_env('RATE_LIMIT_PRUNE_SECONDS', '300'))
+    
+    # Alias manager (test_bot.py): /generate limits and its fixed-window rate limit
+    MAX_ALIASES_PER_GENERATE = int(get_optional_env('MAX_ALIASES_PER_GENERATE', '10'))
+    MAX_DOT_ALIASES = int(get_optional_env('MAX_DOT_ALIASES', '10'))
+    MAX_CUSTOM_ALIASES = int(get_optional_env('MAX_CUSTOM_ALIASES', '10'))
+    RATE_LIMIT_WINDOW_SECONDS = int(get_optional_env('RATE_LIMIT_WINDOW_SECONDS', '60'))
+    RATE_LIMIT_MAX_REQUESTS = int(get_optional_env('RATE_LIMIT_MAX_REQUESTS', '10'))
     
     # Gmail-specific
     GMAIL_DOMAINS = ['gmail.com', 'googlemail.com']
@@ -40,6 +107,18 @@ class Config:
         """Validate configuration."""
         if not self.BOT_TOKEN.startswith(''):
             raise ValueError("Invalid Telegram Bot Token format")
+        if self.BOT_MODE not in ('polling', 'webhook'):
+            raise ValueError(f"BOT_MODE must be 'polling' or 'webhook', not '{self.BOT_MODE}'")
+        if self.BOT_MODE == 'webhook':
+            if not self.WEBHOOK_URL.startswith('https://'):
+                raise ValueError("WEBHOOK_URL must be an https:// URL in webhook mode")
+            # Telegram only accepts 1-256 characters from A-Z, a-z, 0-9, _ and -
+            if not re.fullmatch(r'[A-Za-z0-9_-]{1,256}', self.WEBHOOK_SECRET_TOKEN):
+                raise ValueError("WEBHOOK_SECRET_TOKEN must be 1-256 characters of A-Z, a-z, 0-9, _ or -")
+            if not 1 <= self.WEBHOOK_MAX_CONNECTIONS <= 100:
+                raise ValueError("WEBHOOK_MAX_CONNECTIONS must be between 1 and 100")
+        if not 1 <= self.INLINE_PAGE_SIZE <= 50:
+            raise ValueError("INLINE_PAGE_SIZE must be between 1 and 50")
         return True
 
 # Create and validate config instance
@@ -0,0 +1,346 @@
+"""
+Long-lived SQLite connections shared by the bots
+"""
+
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ConnectionManager:
+    """
+    Keeps one long-lived connection per thread instead of reconnecting per query.
+
+    Connections run in WAL mode with synchronous=NORMAL, so a commit is an
+    append to the write-ahead log rather than a full fsync, and reuse their
+    prepared-statement cache across calls.
+    """
+
+    def __init__(self, db_path: str, cached_statements: int = 128, busy_timeout_ms: int = 5000):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.transactions = 0
+        self.query_time_total = 0.0
+        self.query_time_max = 0.0
+
+    def _open(self) -> sqlite3.Connection:
+        # Each connection is only used by its own thread; close() may run elsewhere
+        conn = sqlite3.connect(
+            self.db_path,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        with self._lock:
+            self._connections.append(conn)
+            self.connections_opened += 1
+        logger.debug(f"Opened SQLite connection to {self.db_path}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block as one transaction: commit on success, roll back on error."""
+        conn = self.connection()
+        started = time.perf_counter()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.transactions += 1
+                self.query_time_total += elapsed
+                self.query_time_max = max(self.query_time_max, elapsed)
+
+    def close(self):
+        """Close every connection opened by any thread."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'connections_opened': self.connections_opened,
+                'transactions': self.transactions,
+                'avg_ms': self.query_time_total / self.transactions * 1000 if self.transactions else 0.0,
+                'max_ms': self.query_time_max * 1000,
+            }
+
+class DatabaseWorker:
+    """
+    Runs blocking database calls on one dedicated thread.
+
+    Handlers await the result instead of touching SQLite on the event loop.
+    The queue is bounded; when it is full, callers wait asynchronously for
+    space rather than blocking the loop.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_queue: int = 1000, name: str = 'sqlite-worker'):
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.max_depth = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Finish queued calls, then stop the thread."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(self._STOP)
+            thread.join(timeout)
+        self._thread = None
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) on the worker thread and await its result."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        item = (func, args, kwargs, loop, future, time.perf_counter())
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                break
+            except queue.Full:
+                await asyncio.sleep(0.005)
+        with self._lock:
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return await future
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any, error: Optional[BaseException]):
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            func, args, kwargs, loop, future, enqueued_at = item
+            waited = time.perf_counter() - enqueued_at
+            result, error = None, None
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                error = e
+            with self._lock:
+                self.completed += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+            try:
+                loop.call_soon_threadsafe(self._resolve, future, result, error)
+            except RuntimeError:
+                # The event loop is already closed; nobody is waiting any more
+                pass
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'depth': self._queue.qsize(),
+                'max_depth': self.max_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'avg_wait_ms': self.wait_time_total / self.completed * 1000 if self.completed else 0.0,
+                'max_wait_ms': self.wait_time_max * 1000,
+            }
+
+class AsyncDatabase:
+    """Awaitable view of a database object: every method call runs on the worker."""
+
+    def __init__(self, database: Any, worker: DatabaseWorker):
+        self._database = database
+        self.worker = worker
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._database, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await self.worker.run(attr, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+class WriteBehindBuffer:
+    """
+    Coalesces small writes and flushes them in one transaction.
+
+    Rows are grouped by statement and written with executemany every
+    `flush_interval` seconds, or as soon as `flush_rows` are pending. Rows
+    added with the same key replace each other, so repeated upserts of one
+    record cost a single write. Once `max_rows` are pending, callers wait
+    for a flush before adding more.
+    
+    If the batch transaction fails, its rows are retried one transaction
+    each, so a bad row only loses itself; its `on_failure` callback runs.
+    """
+
+    def __init__(self, pool: ConnectionManager, worker: DatabaseWorker,
+                 flush_interval: float = 0.25, flush_rows: int = 500, max_rows: int = 5000):
+        self.pool = pool
+        self.worker = worker
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.max_rows = max_rows
+        self._pending: Dict[str, Dict[Any, Tuple[tuple, Optional[Callable[[], None]]]]] = {}
+        self._rows = 0
+        self._sequence = 0
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.rows_failed = 0
+        self.flush_time_total = 0.0
+        self.flush_time_max = 0.0
+
+    def _ensure_flusher(self):
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def add(self, sql: str, params: tuple = (), key: Any = None,
+                  on_failure: Optional[Callable[[], None]] = None):
+        """
+        Queue one row for sql; a non-None key replaces an earlier pending row with that key.
+        
+        on_failure is called on the event loop if the row could not be written.
+        """
+        self._ensure_flusher()
+        if self._rows >= self.max_rows:
+            await self.flush()
+
+        rows = self._pending.setdefault(sql, {})
+        if key is None:
+            self._sequence += 1
+            key = ('__row__', self._sequence)
+        if key not in rows:
+            self._rows += 1
+        rows[key] = (params, on_failure)
+
+        if self._rows >= self.flush_rows:
+            await self.flush()
+
+    def _write(self, batch: Dict[str, List[tuple]]) -> List[Tuple[str, int]]:
+        """Write the batch; returns (sql, row index) for every row that could not be written."""
+        try:
+            with self.pool.transaction() as conn:
+                for sql, rows in batch.items():
+                    conn.executemany(sql, rows)
+            return []
+        except Exception as e:
+            logger.warning(f"Write-behind batch failed ({e}); retrying row by row")
+        
+        failed = []
+        for sql, rows in batch.items():
+            for index, row in enumerate(rows):
+                try:
+                    with self.pool.transaction() as conn:
+                        conn.execute(sql, row)
+                except Exception as e:
+                    logger.error(f"Write-behind row dropped: {e} ({sql.split()[0]} {row!r})")
+                    failed.append((sql, index))
+        return failed
+
+    async def flush(self):
+        """Write everything pending in one transaction on the database worker."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._rows:
+                return
+            pending = {sql: list(rows.values()) for sql, rows in self._pending.items()}
+            batch = {sql: [params for params, _ in rows] for sql, rows in pending.items()}
+            count = self._rows
+            self._pending = {}
+            self._rows = 0
+
+            started = time.perf_counter()
+            try:
+                failed = await self.worker.run(self._write, batch)
+            except Exception as e:
+                logger.error(f"Write-behind flush of {count} rows failed: {e}")
+                failed = [(sql, index) for sql, rows in batch.items() for index in range(len(rows))]
+            finally:
+                elapsed = time.perf_counter() - started
+                self.flushes += 1
+                self.flush_time_total += elapsed
+                self.flush_time_max = max(self.flush_time_max, elapsed)
+
+            self.rows_flushed += count - len(failed)
+            self.rows_failed += len(failed)
+            for sql, index in failed:
+                on_failure = pending[sql][index][1]
+                if on_failure is not None:
+                    on_failure()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        """Stop the periodic flusher and write whatever is still pending."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'pending': self._rows,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+            'rows_failed': self.rows_failed,
+            'avg_flush_ms': self.flush_time_total / self.flushes * 1000 if self.flushes else 0.0,
+            'max_flush_ms': self.flush_time_max * 1000,
+        }
@@ -12,7 +12,7 @@ def install_dependencies():
     print("-" * 40)
     
     requirements = [
-        "python-telegram-bot[job-queue]==20.7",
+        "python-telegram-bot[job-queue,webhooks]==20.7",
         "python-dotenv==1.0.0"
     ]
     
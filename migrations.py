@@ -0,0 +1,213 @@
+"""
+Versioned schema migrations shared by the bots
+
+Both bots default to the same DATABASE_FILE, so there is one ordered list
+of migrations for the whole file. PRAGMA user_version records how many
+have been applied; each pending migration runs in its own transaction
+together with the version bump. Every step tolerates databases created
+before versioning existed (user_version 0 with tables already present).
+"""
+
+import logging
+import sqlite3
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+Migration = Tuple[str, Callable[[sqlite3.Connection], None]]
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+# ---------------- MIGRATIONS ----------------
+def _create_alias_bot_tables(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_emails (
+            user_id INTEGER,
+            email TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, email),
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    """)
+    # One counter per user per minute (epoch // 60)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            user_id INTEGER NOT NULL,
+            minute INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, minute)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_minute
+        ON rate_limit_buckets(minute)
+    """)
+
+def _create_alias_manager_tables(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS usersettings (
+            user_id INTEGER PRIMARY KEY,
+            base_email TEXT NOT NULL,
+            catch_all INTEGER DEFAULT 0,
+            accepted_terms INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS aliases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            base_email TEXT NOT NULL,
+            alias TEXT NOT NULL,
+            label TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usersettings (user_id)
+        )
+    """)
+
+def _fold_rate_limit_events(conn: sqlite3.Connection):
+    """Fold alias_bot's old per-request rate_limits rows into minute buckets and drop them."""
+    # test_bot's own rate_limits table (request_count/window_start) is left alone
+    if 'command' in _columns(conn, 'rate_limits'):
+        conn.execute("""
+            INSERT INTO rate_limit_buckets (user_id, minute, count)
+            SELECT user_id, CAST(strftime('%s', timestamp) AS INTEGER) / 60, COUNT(*)
+            FROM rate_limits
+            WHERE timestamp >= datetime('now', '-1 hour')
+            GROUP BY 1, 2
+            ON CONFLICT (user_id, minute) DO UPDATE SET count = count + excluded.count
+        """)
+        conn.execute("DROP TABLE rate_limits")
+    conn.execute("DROP TABLE IF EXISTS rate_limit_state")
+
+def _create_alias_manager_rate_limits(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            user_id INTEGER PRIMARY KEY,
+            request_count INTEGER DEFAULT 0,
+            window_start TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def _add_canonical_emails(conn: sqlite3.Connection):
+    """Add and backfill user_emails.canonical, merging rows for the same inbox."""
+    if 'canonical' not in _columns(conn, 'user_emails'):
+        conn.execute("ALTER TABLE user_emails ADD COLUMN canonical TEXT")
+
+    # Same rules as alias_bot.EmailValidator.canonical_address: lowercase,
+    # drop the +tag and dots, fold googlemail.com into gmail.com
+    conn.execute("""
+        UPDATE user_emails SET canonical = (
+            SELECT replace(
+                       CASE WHEN instr(local_part, '+') > 0
+                            THEN substr(local_part, 1, instr(local_part, '+') - 1)
+                            ELSE local_part END,
+                       '.', '')
+                   || '@' ||
+                   CASE domain WHEN 'googlemail.com' THEN 'gmail.com' ELSE domain END
+            FROM (
+                SELECT substr(address, 1, instr(address, '@') - 1) AS local_part,
+                       substr(address, instr(address, '@') + 1) AS domain
+                FROM (SELECT lower(trim(user_emails.email)) AS address)
+            )
+        )
+        WHERE canonical IS NULL
+    """)
+    # Keep the oldest row per (user, inbox)
+    conn.execute("""
+        DELETE FROM user_emails
+        WHERE rowid NOT IN (
+            SELECT MIN(rowid) FROM user_emails GROUP BY user_id, canonical
+        )
+    """)
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_user_emails_canonical
+        ON user_emails(canonical, user_id)
+    """)
+
+def _add_hot_path_indexes(conn: sqlite3.Connection):
+    """Covering indexes for per-user alias listing and email lookups."""
+    # list_aliases/export_aliases/delete_alias filter on user_id and sort by created_at;
+    # the rowid (id) is part of every index entry
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_aliases_user_created
+        ON aliases(user_id, created_at, alias)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_user_emails_email
+        ON user_emails(email, user_id)
+    """)
+    conn.execute("ANALYZE")
+
+def _add_unique_aliases(conn: sqlite3.Connection):
+    """Drop duplicate (user_id, alias) rows, keeping the first, and enforce uniqueness."""
+    conn.execute("""
+        DELETE FROM aliases
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM aliases GROUP BY user_id, alias
+        )
+    """)
+    # Acts as UNIQUE(user_id, alias) without rebuilding the table
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_aliases_user_alias
+        ON aliases(user_id, alias)
+    """)
+
+def _add_alias_keyset_index(conn: sqlite3.Connection):
+    """Put id right after created_at so (created_at, id) keyset pages are one range scan."""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_aliases_user_keyset
+        ON aliases(user_id, created_at, id, alias)
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_aliases_user_created")
+    conn.execute("ANALYZE aliases")
+
+MIGRATIONS: List[Migration] = [
+    ("create alias bot tables", _create_alias_bot_tables),
+    ("create alias manager tables", _create_alias_manager_tables),
+    ("fold rate-limit events into minute buckets", _fold_rate_limit_events),
+    ("create alias manager rate limits", _create_alias_manager_rate_limits),
+    ("add canonical email column", _add_canonical_emails),
+    ("add hot-path indexes", _add_hot_path_indexes),
+    ("make aliases unique per user", _add_unique_aliases),
+    ("key the alias listing index on (created_at, id)", _add_alias_keyset_index),
+]
+
+# ---------------- RUNNER ----------------
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn: sqlite3.Connection, migrations: List[Migration] = MIGRATIONS) -> int:
+    """Apply every migration newer than PRAGMA user_version; returns the resulting version."""
+    if conn.in_transaction:
+        conn.commit()
+
+    current = schema_version(conn)
+    for version, (description, migrate) in enumerate(migrations, start=1):
+        if version <= current:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the write lock
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        logger.info(f"Applied migration {version}: {description}")
+
+    return schema_version(conn)
@@ -0,0 +1,278 @@
+"""
+Flood-limit-aware outbound scheduler shared by the bots
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, passed as rate_limit_args; lower numbers go first
+INTERACTIVE = 0
+BULK = 1
+LANE_NAMES = {INTERACTIVE: 'interactive', BULK: 'bulk'}
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until one token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class _ChatState:
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.paused_until = 0.0
+        self.busy = False
+
+class _Job:
+    __slots__ = ('chat_key', 'future', 'enqueued_at')
+
+    def __init__(self, chat_key: Union[int, str], future: asyncio.Future):
+        self.chat_key = chat_key
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+class OutboundScheduler(BaseRateLimiter[int]):
+    """
+    Paces every Bot API request that targets a chat.
+
+    Requests wait in per-chat FIFO queues inside priority lanes. A single
+    dispatcher grants them when both the chat's token bucket and the
+    global one have a token, taking interactive replies ahead of bulk
+    traffic and rotating between chats. One request per chat is in flight
+    at a time, so messages arrive in order. RetryAfter pauses just that
+    chat and re-queues the request at the head of its queue. Requests
+    without a chat_id (callback answers, getMe, ...) bypass the queues.
+
+    Pass `rate_limit_args=BULK` to a bot method to send it in the bulk lane.
+    """
+
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1, chat_burst: float = 3,
+                 group_per_minute: float = 20, max_retries: int = 3, max_chats: int = 1024):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_per_minute = group_per_minute
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._lanes: Dict[int, "OrderedDict[Union[int, str], deque]"] = {
+            lane: OrderedDict() for lane in LANE_NAMES
+        }
+        self._chats: Dict[Union[int, str], _ChatState] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.max_depth = 0
+        self.granted = 0
+        self.sent = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def initialize(self) -> None:
+        self._ensure_dispatcher()
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._dispatcher
+            self._dispatcher = None
+        for lane in self._lanes.values():
+            for jobs in lane.values():
+                for job in jobs:
+                    job.future.cancel()
+            lane.clear()
+
+    def _ensure_dispatcher(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    # ---------------- QUEUEING ----------------
+    def _chat(self, chat_key: Union[int, str]) -> _ChatState:
+        state = self._chats.get(chat_key)
+        if state is None:
+            if len(self._chats) >= self.max_chats:
+                self._forget_idle_chats()
+            # Negative ids and @usernames are groups/channels, limited per minute
+            if isinstance(chat_key, str) or chat_key < 0:
+                bucket = TokenBucket(self.group_per_minute / 60, self.chat_burst)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            state = self._chats[chat_key] = _ChatState(bucket)
+        return state
+
+    def _forget_idle_chats(self):
+        now = time.monotonic()
+        queued = {chat_key for lane in self._lanes.values() for chat_key in lane}
+        for chat_key, state in list(self._chats.items()):
+            if (chat_key not in queued and not state.busy
+                    and state.paused_until <= now and state.bucket.is_full(now)):
+                del self._chats[chat_key]
+
+    def depth(self) -> int:
+        return sum(len(jobs) for lane in self._lanes.values() for jobs in lane.values())
+
+    def _enqueue(self, priority: int, job: _Job, front: bool = False):
+        jobs = self._lanes[priority].setdefault(job.chat_key, deque())
+        if front:
+            jobs.appendleft(job)
+        else:
+            jobs.append(job)
+        self.max_depth = max(self.max_depth, self.depth())
+        self._wakeup.set()
+
+    def _grant_ready(self) -> Optional[float]:
+        """Grant every request that may go now; returns seconds until the next could, if any wait."""
+        now = time.monotonic()
+        next_wait: Optional[float] = None
+
+        def later(seconds: float):
+            nonlocal next_wait
+            next_wait = seconds if next_wait is None else min(next_wait, seconds)
+
+        for priority in sorted(self._lanes):
+            lane = self._lanes[priority]
+            for chat_key in list(lane):
+                jobs = lane[chat_key]
+                while jobs and jobs[0].future.done():
+                    jobs.popleft()  # the caller gave up
+                if not jobs:
+                    del lane[chat_key]
+                    continue
+
+                state = self._chat(chat_key)
+                if state.busy:
+                    continue
+                if state.paused_until > now:
+                    later(state.paused_until - now)
+                    continue
+                chat_wait = state.bucket.delay(now)
+                if chat_wait:
+                    later(chat_wait)
+                    continue
+                global_wait = self.global_bucket.delay(now)
+                if global_wait:
+                    later(global_wait)
+                    return next_wait
+
+                job = jobs.popleft()
+                state.bucket.take(now)
+                self.global_bucket.take(now)
+                state.busy = True
+                self.granted += 1
+                waited = time.perf_counter() - job.enqueued_at
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+                job.future.set_result(None)
+                # Round-robin: this chat goes to the back of the lane
+                if jobs:
+                    lane.move_to_end(chat_key)
+                else:
+                    del lane[chat_key]
+        return next_wait
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            wait = self._grant_ready()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+
+    # ---------------- REQUESTS ----------------
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        chat_key = data.get('chat_id')
+        if chat_key is None:
+            return await callback(*args, **kwargs)
+        with contextlib.suppress(ValueError, TypeError):
+            chat_key = int(chat_key)
+
+        self._ensure_dispatcher()
+        priority = rate_limit_args if rate_limit_args in self._lanes else INTERACTIVE
+        attempt = 0
+        while True:
+            job = _Job(chat_key, asyncio.get_running_loop().create_future())
+            # A retry keeps its place at the head of the chat's queue
+            self._enqueue(priority, job, front=attempt > 0)
+            try:
+                await job.future
+            except asyncio.CancelledError:
+                if job.future.done() and not job.future.cancelled():
+                    self._release(chat_key)  # granted, but the caller went away
+                raise
+
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                self.retries += 1
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    logger.warning(f"{endpoint} to {chat_key} still flood-limited after {attempt} retries")
+                    raise
+                logger.info(f"Flood limit on {chat_key}; retrying {endpoint} in {e.retry_after}s")
+                self._chat(chat_key).paused_until = time.monotonic() + float(e.retry_after) + 0.1
+                attempt += 1
+            finally:
+                self._release(chat_key)
+
+    def _release(self, chat_key: Union[int, str]):
+        self._chat(chat_key).busy = False
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, float]:
+        lanes = {
+            name: sum(len(jobs) for jobs in self._lanes[lane].values())
+            for lane, name in LANE_NAMES.items()
+        }
+        return {
+            **lanes,
+            'depth': sum(lanes.values()),
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'retries': self.retries,
+            'failures': self.failures,
+            'chats': len(self._chats),
+            'avg_wait_ms': self.wait_time_total / self.granted * 1000 if self.granted else 0.0,
+            'max_wait_ms': self.wait_time_max * 1000,
+        }
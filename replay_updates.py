@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Replay recorded Telegram updates against a bot running in webhook mode
+
+Each file may hold one Update object, a JSON list of them, or one per
+line (JSONL). Updates are POSTed to the local listener with the secret
+token header, exactly as Telegram would deliver them.
+
+    BOT_MODE=webhook ... python alias_bot.py
+    python replay_updates.py updates/*.json
+    python replay_updates.py --url http://127.0.0.1:8443/telegram --secret s3cret update.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from typing import Iterator
+
+from dotenv import load_dotenv
+
+def load_updates(path: str) -> Iterator[dict]:
+    with open(path, encoding='utf-8') as f:
+        text = f.read().strip()
+    if not text:
+        return
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    yield from data if isinstance(data, list) else [data]
+
+def post_update(url: str, secret: str, update: dict) -> int:
+    """POST one update; returns the HTTP status."""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(update).encode('utf-8'),
+        headers={
+            'Content-Type': 'application/json',
+            'X-Telegram-Bot-Api-Secret-Token': secret,
+        },
+        method='POST',
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def main() -> int:
+    load_dotenv()
+    # Defaults mirror config.py without importing it (that would need a bot token)
+    listen = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+    host = '127.0.0.1' if listen in ('0.0.0.0', '::') else listen
+    default_url = f"http://{host}:{os.getenv('WEBHOOK_PORT', '8443')}/{os.getenv('WEBHOOK_PATH', 'telegram').strip('/')}"
+
+    parser = argparse.ArgumentParser(description="POST recorded updates to a local webhook listener")
+    parser.add_argument('files', nargs='+', help="JSON or JSONL files with Update objects")
+    parser.add_argument('--url', default=default_url, help=f"listener URL (default {default_url})")
+    parser.add_argument('--secret', default=os.getenv('WEBHOOK_SECRET_TOKEN', ''),
+                        help="secret token header (default WEBHOOK_SECRET_TOKEN)")
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.files:
+        for update in load_updates(path):
+            status = post_update(args.url, args.secret, update)
+            ok = status == 200
+            failed += not ok
+            print(f"{'✅' if ok else '❌'} {path} update {update.get('update_id', '?')}: HTTP {status}")
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
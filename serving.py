@@ -0,0 +1,140 @@
+"""
+Update delivery shared by the bots: polling or webhook, processed concurrently
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application, BaseUpdateProcessor
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates concurrently, but one user's updates strictly in order.
+
+    Each user has a mailbox. The first update to arrive for an idle user
+    keeps its concurrency slot and works through that user's mailbox;
+    later updates for the same user are queued there and give their slot
+    back at once. A user with a backlog therefore occupies at most one of
+    the max_concurrent_updates slots. Updates without a user or chat are
+    not serialized, and neither are inline queries: each one supersedes
+    the previous, so the handler drops stale ones instead of queueing them.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._mailboxes: Dict[int, deque] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.processed = 0
+        self.max_backlog = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        for mailbox in self._mailboxes.values():
+            for coroutine, _ in mailbox:
+                coroutine.close()
+        self._mailboxes.clear()
+
+    @staticmethod
+    def _key(update: object) -> Optional[int]:
+        if isinstance(update, Update) and not update.inline_query:
+            if update.effective_user:
+                return update.effective_user.id
+            if update.effective_chat:
+                return update.effective_chat.id
+        return None
+
+    async def _run(self, coroutine: Awaitable[Any], queued_at: float):
+        waited = time.perf_counter() - queued_at
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await coroutine
+        finally:
+            self.in_flight -= 1
+            self.processed += 1
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._key(update)
+        if key is None:
+            await self._run(coroutine, time.perf_counter())
+            return
+
+        mailbox = self._mailboxes.get(key)
+        if mailbox is not None:
+            # This user's updates are already being worked through
+            mailbox.append((coroutine, time.perf_counter()))
+            self.max_backlog = max(self.max_backlog, self.backlog())
+            return
+
+        mailbox = self._mailboxes[key] = deque([(coroutine, time.perf_counter())])
+        try:
+            while mailbox:
+                await self._run(*mailbox[0])
+                mailbox.popleft()
+        finally:
+            # Only non-empty if we were cancelled mid-backlog
+            del self._mailboxes[key]
+            for pending, _ in list(mailbox)[1:]:
+                pending.close()
+
+    def backlog(self) -> int:
+        """Updates waiting behind an earlier update from the same user."""
+        return sum(len(mailbox) - 1 for mailbox in self._mailboxes.values())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'max_concurrent': self.max_concurrent_updates,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'backlog': self.backlog(),
+            'max_backlog': self.max_backlog,
+            'users': len(self._mailboxes),
+            'processed': self.processed,
+            'avg_wait_ms': self.wait_time_total / self.processed * 1000 if self.processed else 0.0,
+            'max_wait_ms': self.wait_time_max * 1000,
+        }
+
+def webhook_url() -> str:
+    """Public URL Telegram posts updates to: WEBHOOK_URL plus WEBHOOK_PATH."""
+    return f"{config.WEBHOOK_URL.rstrip('/')}/{config.WEBHOOK_PATH.strip('/')}"
+
+def describe_mode() -> str:
+    if config.BOT_MODE == 'webhook':
+        return f"webhook on {config.WEBHOOK_LISTEN}:{config.WEBHOOK_PORT}/{config.WEBHOOK_PATH.strip('/')}"
+    return "polling"
+
+def run_application(application: Application, allowed_updates: Optional[List[str]] = None):
+    """
+    Run until stopped, receiving updates the way BOT_MODE selects.
+
+    In webhook mode PTB's built-in listener accepts POSTs on WEBHOOK_PATH,
+    registers webhook_url() with Telegram and rejects requests without
+    the X-Telegram-Bot-Api-Secret-Token header matching WEBHOOK_SECRET_TOKEN.
+    """
+    if config.BOT_MODE == 'webhook':
+        logger.info(f"Serving updates via {describe_mode()}")
+        application.run_webhook(
+            listen=config.WEBHOOK_LISTEN,
+            port=config.WEBHOOK_PORT,
+            url_path=config.WEBHOOK_PATH.strip('/'),
+            webhook_url=webhook_url(),
+            secret_token=config.WEBHOOK_SECRET_TOKEN,
+            max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=allowed_updates,
+        )
+    else:
+        application.run_polling(allowed_updates=allowed_updates)
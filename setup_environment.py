@@ -29,8 +29,24 @@ TELEGRAM_BOT_TOKEN=your_bot_token_here
 DATABASE_FILE=aliases.db
 MAX_ALIASES_PER_USER=1000
 MAX_DOT_VARIANTS=100
+ALIASES_PAGE_SIZE=25
 RATE_LIMIT_PER_MINUTE=30
 RATE_LIMIT_PER_HOUR=200
+MAX_ALIASES_PER_GENERATE=10
+RATE_LIMIT_WINDOW_SECONDS=60
+RATE_LIMIT_MAX_REQUESTS=10
+PROGRESS_MIN_INTERVAL_SECONDS=2
+INLINE_CACHE_TIME=300
+
+# Update delivery: polling (default) or webhook
+BOT_MODE=polling
+WEBHOOK_URL=
+WEBHOOK_LISTEN=0.0.0.0
+WEBHOOK_PORT=8443
+WEBHOOK_PATH=telegram
+WEBHOOK_SECRET_TOKEN=
+WEBHOOK_MAX_CONNECTIONS=40
+MAX_CONCURRENT_UPDATES=32
 
 # Admin User IDs (comma separated, optional)
 ADMIN_USER_IDS=
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sqlite3
 import logging
@@ -5,8 +6,10 @@ import csv
 import re
 import secrets
 from datetime import datetime, timedelta
-from io import StringIO
-from typing import Dict, List, Optional, Tuple
+import gzip
+import io
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -16,8 +19,17 @@ from telegram.ext import (
 from telegram.constants import ParseMode
 
 from config import Config
+from db_pool import AsyncDatabase, DatabaseWorker
+from migrations import apply_migrations
+from outbound import BULK, OutboundScheduler
+from serving import PerUserUpdateProcessor, describe_mode, run_application
 
 EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# Columns /export may include; plain /export keeps the original four
+EXPORT_COLUMNS = ('alias', 'id', 'created_at', 'base_email', 'label')
+DEFAULT_EXPORT_COLUMNS = ('alias', 'id', 'created_at', 'base_email')
+# Extra generation passes when new aliases collide with ones already stored
+MAX_REGENERATION_ROUNDS = 5
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -32,37 +44,164 @@ class DatabaseManager:
 
     def init_db(self):
         with sqlite3.connect(self.db_path) as conn:
+            apply_migrations(conn)
+
+    def get_connection(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def has_accepted_terms(self, user_id: int) -> bool:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT accepted_terms FROM usersettings WHERE user_id = ?',
+                (user_id,)
+            )
+            result = cursor.fetchone()
+            return bool(result and result[0] == 1)
+
+    def accept_terms(self, user_id: int):
+        with self.get_connection() as conn:
             conn.execute('''
-                CREATE TABLE IF NOT EXISTS usersettings (
-                    user_id INTEGER PRIMARY KEY,
-                    base_email TEXT NOT NULL,
-                    catch_all INTEGER DEFAULT 0,
-                    accepted_terms INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+                INSERT OR REPLACE INTO usersettings (user_id, base_email, accepted_terms)
+                VALUES (?, ?, ?)
+            ''', (user_id, '', 1))
+            conn.commit()
+
+    def get_stats(self) -> Tuple[int, int, int]:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT COUNT(*) FROM usersettings')
+            user_count = cursor.fetchone()[0]
+            
+            cursor.execute('SELECT COUNT(*) FROM aliases')
+            alias_count = cursor.fetchone()[0]
+            
+            cursor.execute('SELECT COUNT(*) FROM usersettings WHERE accepted_terms = 1')
+            accepted_count = cursor.fetchone()[0]
+        return user_count, alias_count, accepted_count
+
+    def get_user_settings(self, user_id: int) -> Optional[Tuple]:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT base_email, catch_all FROM usersettings WHERE user_id = ? AND accepted_terms = 1',
+                (user_id,)
+            )
+            return cursor.fetchone()
+
+    def set_base_email(self, user_id: int, email: str):
+        with self.get_connection() as conn:
             conn.execute('''
-                CREATE TABLE IF NOT EXISTS aliases (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    base_email TEXT NOT NULL,
-                    alias TEXT NOT NULL,
-                    label TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES usersettings (user_id)
-                )
-            ''')
+                INSERT OR REPLACE INTO usersettings (user_id, base_email, accepted_terms)
+                VALUES (?, ?, 1)
+            ''', (user_id, email))
+            conn.commit()
+
+    def set_catch_all(self, user_id: int, enabled: bool):
+        with self.get_connection() as conn:
             conn.execute('''
-                CREATE TABLE IF NOT EXISTS rate_limits (
-                    user_id INTEGER PRIMARY KEY,
-                    request_count INTEGER DEFAULT 0,
-                    window_start TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+                UPDATE usersettings SET catch_all = ? WHERE user_id = ?
+            ''', (int(enabled), user_id))
             conn.commit()
 
-    def get_connection(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.db_path)
+    def add_aliases(self, user_id: int, base_email: str, aliases: List[str]) -> List[str]:
+        """Insert aliases in one batch, skipping ones the user already has; returns those stored."""
+        aliases = list(dict.fromkeys(aliases))
+        if not aliases:
+            return []
+        with self.get_connection() as conn:
+            placeholders = ','.join('?' * len(aliases))
+            existing = {row[0] for row in conn.execute(f'''
+                SELECT alias FROM aliases WHERE user_id = ? AND alias IN ({placeholders})
+            ''', (user_id, *aliases))}
+            fresh = [alias for alias in aliases if alias not in existing]
+            conn.executemany('''
+                INSERT INTO aliases (user_id, base_email, alias)
+                VALUES (?, ?, ?)
+                ON CONFLICT (user_id, alias) DO NOTHING
+            ''', [(user_id, base_email, alias) for alias in fresh])
+            conn.commit()
+            return fresh
+
+    def list_aliases(self, user_id: int, limit: int = 50,
+                     before: Optional[Tuple[str, int]] = None,
+                     after: Optional[Tuple[str, int]] = None) -> Tuple[List[Tuple], bool]:
+        """
+        One page of (id, alias, created_at), newest first, keyed on (created_at, id).
+        
+        `before` pages towards older aliases and `after` towards newer ones.
+        Returns (rows, more), where `more` says whether another page exists
+        in the direction of travel.
+        """
+        if after:
+            keyset, params, order = 'AND (created_at, id) > (?, ?)', after, 'ASC'
+        elif before:
+            keyset, params, order = 'AND (created_at, id) < (?, ?)', before, 'DESC'
+        else:
+            keyset, params, order = '', (), 'DESC'
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT id, alias, created_at FROM aliases
+                WHERE user_id = ? {keyset}
+                ORDER BY created_at {order}, id {order}
+                LIMIT ?
+            ''', (user_id, *params, limit + 1))
+            rows = cursor.fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if after:
+            rows.reverse()
+        return rows, more
+
+    def delete_alias(self, alias_id: int, user_id: int) -> int:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM aliases 
+                WHERE id = ? AND user_id = ?
+            ''', (alias_id, user_id))
+            conn.commit()
+            return cursor.rowcount
+
+    def export_page(self, user_id: int, columns: Sequence[str] = DEFAULT_EXPORT_COLUMNS,
+                    since: Optional[str] = None, until: Optional[str] = None,
+                    after: Optional[Tuple[str, int]] = None,
+                    page_size: int = 500) -> Tuple[List[Tuple], Optional[Tuple[str, int]]]:
+        """
+        One page of a user's aliases, newest first, and the key of the next page.
+        
+        Pages are keyset-paginated on (created_at, id), so each one is a
+        fresh range scan of idx_aliases_user_keyset. Pass the returned key
+        as `after` to continue; it is None on the last page. since/until
+        bound created_at (until is exclusive).
+        """
+        unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+        
+        filters = ''
+        params: List = [user_id]
+        if since:
+            filters += ' AND created_at >= ?'
+            params.append(since)
+        if until:
+            filters += ' AND created_at < ?'
+            params.append(until)
+        if after:
+            filters += ' AND (created_at, id) < (?, ?)'
+            params.extend(after)
+        
+        with self.get_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {', '.join(columns)}, created_at, id FROM aliases
+                WHERE user_id = ?{filters}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            ''', (*params, page_size)).fetchall()
+        next_key = tuple(rows[-1][-2:]) if len(rows) == page_size else None
+        return [row[:-2] for row in rows], next_key
 
 class EmailValidator:
     @staticmethod
@@ -113,7 +252,7 @@ class AliasGenerator:
             while len(aliases) < count and attempts < max_attempts:
                 attempts += 1
                 num_dots = secrets.choice([1, 2])
-                positions = sorted(secrets.sample(range(1, len(local)), num_dots))
+                positions = sorted(secrets.SystemRandom().sample(range(1, len(local)), num_dots))
                 
                 alias_local = local
                 for pos in reversed(positions):
@@ -177,11 +316,31 @@ class AliasManagerBot:
     def __init__(self, token: str):
         self.token = token
         self.db = DatabaseManager(Config.DATABASE_FILE)
+        # Handlers await self.adb so SQLite is only touched on the worker thread
+        self.db_worker = DatabaseWorker(max_queue=Config.DB_WORKER_QUEUE_SIZE)
+        self.adb = AsyncDatabase(self.db, self.db_worker)
         self.validator = EmailValidator()
         self.generator = AliasGenerator()
         self.rate_limiter = RateLimiter(self.db)
-        
-        self.application = Application.builder().token(token).build()
+        # Every Bot API request is paced here; exports go in the bulk lane
+        self.outbound = OutboundScheduler(
+            global_rate=Config.OUTBOUND_GLOBAL_RATE,
+            chat_rate=Config.OUTBOUND_CHAT_RATE,
+            chat_burst=Config.OUTBOUND_CHAT_BURST,
+            group_per_minute=Config.OUTBOUND_GROUP_PER_MINUTE,
+            max_retries=Config.OUTBOUND_MAX_RETRIES,
+        )
+        # Concurrent across users; one user's updates (and pending_generation) stay in order
+        self.update_processor = PerUserUpdateProcessor(Config.MAX_CONCURRENT_UPDATES)
+        
+        self.application = (
+            Application.builder()
+            .token(token)
+            .rate_limiter(self.outbound)
+            .concurrent_updates(self.update_processor)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         
         self._setup_handlers()
 
@@ -197,15 +356,11 @@ class AliasManagerBot:
         self.application.add_handler(CommandHandler("owner", self.owner_commands))
         self.application.add_handler(CallbackQueryHandler(self.terms_callback, pattern='^terms_'))
 
-    def check_terms_accepted(self, user_id: int) -> bool:
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT accepted_terms FROM usersettings WHERE user_id = ?',
-                (user_id,)
-            )
-            result = cursor.fetchone()
-            return result and result[0] == 1
+    async def _post_shutdown(self, application: Application):
+        self.db_worker.stop()
+
+    async def check_terms_accepted(self, user_id: int) -> bool:
+        return await self.adb.has_accepted_terms(user_id)
 
     async def terms_callback(self, update: Update, context: CallbackContext):
         query = update.callback_query
@@ -213,12 +368,7 @@ class AliasManagerBot:
         action = query.data.split('_')[1]
 
         if action == 'accept':
-            with self.db.get_connection() as conn:
-                conn.execute('''
-                    INSERT OR REPLACE INTO usersettings (user_id, base_email, accepted_terms)
-                    VALUES (?, ?, ?)
-                ''', (user_id, '', 1))
-                conn.commit()
+            await self.adb.accept_terms(user_id)
 
             welcome_text = """
 ✅ Thank you for accepting our Terms & Conditions!
@@ -255,7 +405,7 @@ Thank you for your understanding.
     async def start(self, update: Update, context: CallbackContext):
         user_id = update.effective_user.id
         
-        if self.check_terms_accepted(user_id):
+        if await self.check_terms_accepted(user_id):
             welcome_text = f"""
 👋 Welcome back {update.effective_user.first_name}!
 
@@ -312,7 +462,7 @@ By clicking "Accept", you agree to these terms.
 
     async def help(self, update: Update, context: CallbackContext):
         user_id = update.effective_user.id
-        if not self.check_terms_accepted(user_id):
+        if not await self.check_terms_accepted(user_id):
             await update.message.reply_text("❌ Please accept the Terms & Conditions first using /start")
             return
 
@@ -329,9 +479,10 @@ By clicking "Accept", you agree to these terms.
 `/generate 3 custom` - 3 custom aliases (max: {Config.MAX_CUSTOM_ALIASES})
 
 **Management:**
-`/list` - View all aliases with IDs
+`/list` - Browse your aliases with IDs, newest first
 `/delete 123` - Delete alias by ID
 `/export` - Download CSV export
+`/export gzip columns=alias,created_at from=2024-01-01 to=2024-12-31` - Filtered, compressed export
 
 **Alias Types:**
 • **plus**: `email+tag@domain.com` (Gmail-friendly)
@@ -368,17 +519,10 @@ By clicking "Accept", you agree to these terms.
         subcommand = context.args[0].lower()
         
         if subcommand == 'stats':
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('SELECT COUNT(*) FROM usersettings')
-                user_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) FROM aliases')
-                alias_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) FROM usersettings WHERE accepted_terms = 1')
-                accepted_count = cursor.fetchone()[0]
+            user_count, alias_count, accepted_count = await self.adb.get_stats()
+            worker = self.db_worker.stats()
+            sends = self.outbound.stats()
+            updates = self.update_processor.stats()
                 
             stats_text = f"""
 📊 **Bot Statistics:**
@@ -387,6 +531,9 @@ By clicking "Accept", you agree to these terms.
 ✅ Terms Accepted: {accepted_count}
 📧 Aliases Generated: {alias_count}
 🕒 Uptime: {self.get_uptime()}
+🗄 DB queue: {worker['depth']} (peak {worker['max_depth']}), wait avg {worker['avg_wait_ms']:.2f} ms / max {worker['max_wait_ms']:.2f} ms
+📤 Outbound: {sends['depth']} queued (interactive {sends['interactive']}, bulk {sends['bulk']}, peak {sends['max_depth']}), {sends['sent']} sent, {sends['retries']} flood retries, wait avg {sends['avg_wait_ms']:.0f} ms
+⚙️ Updates: {updates['in_flight']}/{updates['max_concurrent']} in flight (peak {updates['max_in_flight']}), {updates['backlog']} queued behind same user, wait avg {updates['avg_wait_ms']:.0f} ms / max {updates['max_wait_ms']:.0f} ms
             """
             await update.message.reply_text(stats_text, parse_mode=ParseMode.MARKDOWN)
 
@@ -399,19 +546,13 @@ By clicking "Accept", you agree to these terms.
             return f"{days}d {hours}h {minutes}m {seconds}s"
         return "Unknown"
 
-    def get_user_settings(self, user_id: int) -> Optional[Tuple]:
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT base_email, catch_all FROM usersettings WHERE user_id = ? AND accepted_terms = 1',
-                (user_id,)
-            )
-            return cursor.fetchone()
+    async def get_user_settings(self, user_id: int) -> Optional[Tuple]:
+        return await self.adb.get_user_settings(user_id)
 
     async def set_email(self, update: Update, context: CallbackContext):
         user_id = update.effective_user.id
         
-        if not self.check_terms_accepted(user_id):
+        if not await self.check_terms_accepted(user_id):
             await update.message.reply_text("❌ Please accept the Terms & Conditions first using /start")
             return
         
@@ -425,12 +566,7 @@ By clicking "Accept", you agree to these terms.
             await update.message.reply_text("❌ Invalid email format.")
             return
 
-        with self.db.get_connection() as conn:
-            conn.execute('''
-                INSERT OR REPLACE INTO usersettings (user_id, base_email, accepted_terms)
-                VALUES (?, ?, 1)
-            ''', (user_id, email))
-            conn.commit()
+        await self.adb.set_base_email(user_id, email)
 
         if self.validator.is_gmail(email):
             message = f"""
@@ -457,15 +593,15 @@ You can use:
     async def generate_aliases(self, update: Update, context: CallbackContext):
         user_id = update.effective_user.id
         
-        if not self.check_terms_accepted(user_id):
+        if not await self.check_terms_accepted(user_id):
             await update.message.reply_text("❌ Please accept the Terms & Conditions first using /start")
             return
 
-        if not self.rate_limiter.check_rate_limit(user_id):
+        if not await self.db_worker.run(self.rate_limiter.check_rate_limit, user_id):
             await update.message.reply_text("❌ Rate limit exceeded. Please try again later.")
             return
 
-        user_settings = self.get_user_settings(user_id)
+        user_settings = await self.get_user_settings(user_id)
         if not user_settings:
             await update.message.reply_text("❌ Please set your base email first: `/set your.email@domain.com`", parse_mode=ParseMode.MARKDOWN)
             return
@@ -520,9 +656,9 @@ You can use:
             return
 
         if mode == 'plus':
-            aliases = self.generator.generate_plus_alias(base_email, count)
+            generate = self.generator.generate_plus_alias
         elif mode == 'dot':
-            aliases = self.generator.generate_dot_aliases(base_email, count)
+            generate = self.generator.generate_dot_aliases
         elif mode == 'custom':
             if not catch_all_enabled:
                 await update.message.reply_text("""
@@ -534,29 +670,39 @@ Use `/enable_catchall` first and ensure:
 3. You understand spam risks
                 """)
                 return
-            aliases = self.generator.generate_custom_aliases(base_email, count)
+            generate = self.generator.generate_custom_aliases
         else:
             await update.message.reply_text("❌ Invalid mode. Use: plus, dot, or custom")
             return
 
-        with self.db.get_connection() as conn:
-            for alias in aliases:
-                conn.execute('''
-                    INSERT INTO aliases (user_id, base_email, alias)
-                    VALUES (?, ?, ?)
-                ''', (user_id, base_email, alias))
-            conn.commit()
+        aliases = await self._store_new_aliases(user_id, base_email, generate, count)
+        if not aliases:
+            await update.message.reply_text(f"❌ No new {mode} aliases left for `{base_email}`", parse_mode=ParseMode.MARKDOWN)
+            return
 
         alias_list = "\n".join([f"• `{alias}`" for alias in aliases])
+        shortfall = f"\n⚠️ Only {len(aliases)} of {count} were new; the rest already exist.\n" if len(aliases) < count else ""
         message = f"""
 ✅ Generated {len(aliases)} {mode} aliases:
 
 {alias_list}
-
+{shortfall}
 Use `/list` to see all aliases with IDs.
         """
         await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
 
+    async def _store_new_aliases(self, user_id: int, base_email: str, generate, count: int) -> List[str]:
+        """Generate and store aliases, regenerating ones that collide with stored aliases."""
+        stored: List[str] = []
+        for _ in range(1 + MAX_REGENERATION_ROUNDS):
+            generated = generate(base_email, count - len(stored))
+            if not generated:
+                break
+            stored += await self.adb.add_aliases(user_id, base_email, [alias for alias in generated if alias not in stored])
+            if len(stored) >= count:
+                break
+        return stored
+
     async def generate_callback(self, update: Update, context: CallbackContext):
         query = update.callback_query
         user_id = query.from_user.id
@@ -564,7 +710,7 @@ Use `/list` to see all aliases with IDs.
         
         await query.answer(f"Selected {mode} aliases")
         
-        user_settings = self.get_user_settings(user_id)
+        user_settings = await self.get_user_settings(user_id)
         if not user_settings:
             await query.edit_message_text("❌ Please set your base email first using `/set your.email@domain.com`")
             return
@@ -619,39 +765,75 @@ Use `/enable_catchall` first and ensure you have catch-all configured on your do
         except ValueError:
             await update.message.reply_text("❌ Please enter a valid number")
 
+    async def _render_alias_page(self, user_id: int, before: Optional[Tuple[str, int]] = None,
+                                 after: Optional[Tuple[str, int]] = None) -> Tuple[Optional[str], Optional[InlineKeyboardMarkup]]:
+        """Text and Older/Newer buttons for one /list page; (None, None) when there is nothing to show."""
+        aliases, more = await self.adb.list_aliases(user_id, Config.ALIASES_PAGE_SIZE, before, after)
+        if not aliases:
+            return None, None
+
+        alias_text = "📧 Your Aliases:\n\n"
+        for alias_id, alias, created_at in aliases:
+            # created_at is stored as 'YYYY-MM-DD HH:MM:SS' UTC
+            alias_text += f"`{alias}`\nID: `{alias_id}` • {created_at[:16]} UTC\n\n"
+
+        # `more` covers the direction of travel; the way we came always has rows
+        has_older = more if not after else True
+        has_newer = bool(before) or (bool(after) and more)
+        newest_id, _, newest_at = aliases[0]
+        oldest_id, _, oldest_at = aliases[-1]
+        buttons = []
+        if has_newer:
+            buttons.append(InlineKeyboardButton("⬅️ Newer", callback_data=f"list_newer_{newest_id}_{newest_at}"))
+        if has_older:
+            buttons.append(InlineKeyboardButton("Older ➡️", callback_data=f"list_older_{oldest_id}_{oldest_at}"))
+        return alias_text, InlineKeyboardMarkup([buttons]) if buttons else None
+
     async def list_aliases(self, update: Update, context: CallbackContext):
         user_id = update.effective_user.id
         
-        if not self.check_terms_accepted(user_id):
+        if not await self.check_terms_accepted(user_id):
             await update.message.reply_text("❌ Please accept the Terms & Conditions first using /start")
             return
         
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, alias, created_at FROM aliases 
-                WHERE user_id = ? 
-                ORDER BY created_at DESC
-                LIMIT 50
-            ''', (user_id,))
-            aliases = cursor.fetchall()
+        alias_text, markup = await self._render_alias_page(user_id)
 
-        if not aliases:
+        if not alias_text:
             await update.message.reply_text("📭 No aliases found. Generate some with `/generate`")
             return
 
-        alias_text = "📧 Your Aliases:\n\n"
-        for alias_id, alias, created_at in aliases:
-            created_dt = datetime.fromisoformat(created_at)
-            timestamp = created_dt.strftime("%Y-%m-%d %H:%M UTC")
-            alias_text += f"`{alias}`\nID: `{alias_id}` • {timestamp}\n\n"
+        await update.message.reply_text(alias_text, parse_mode=ParseMode.MARKDOWN, reply_markup=markup)
 
-        await update.message.reply_text(alias_text, parse_mode=ParseMode.MARKDOWN)
+    async def list_callback(self, update: Update, context: CallbackContext):
+        query = update.callback_query
+        user_id = query.from_user.id
+        _, direction, alias_id, created_at = query.data.split('_', 3)
+        cursor = (created_at, int(alias_id))
+
+        await query.answer()
+
+        if not await self.check_terms_accepted(user_id):
+            await query.edit_message_text("❌ Please accept the Terms & Conditions first using /start")
+            return
+
+        if direction == 'older':
+            alias_text, markup = await self._render_alias_page(user_id, before=cursor)
+        else:
+            alias_text, markup = await self._render_alias_page(user_id, after=cursor)
+
+        if not alias_text:
+            # Everything past the cursor was deleted; start again from the newest page
+            alias_text, markup = await self._render_alias_page(user_id)
+        if not alias_text:
+            await query.edit_message_text("📭 No aliases found. Generate some with `/generate`")
+            return
+
+        await query.edit_message_text(alias_text, parse_mode=ParseMode.MARKDOWN, reply_markup=markup)
 
     async def delete_alias(self, update: Update, context: CallbackContext):
         user_id = update.effective_user.id
         
-        if not self.check_terms_accepted(user_id):
+        if not await self.check_terms_accepted(user_id):
             await update.message.reply_text("❌ Please accept the Terms & Conditions first using /start")
             return
         
@@ -665,66 +847,122 @@ Use `/enable_catchall` first and ensure you have catch-all configured on your do
             await update.message.reply_text("❌ Please provide a valid alias ID")
             return
 
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                DELETE FROM aliases 
-                WHERE id = ? AND user_id = ?
-            ''', (alias_id, user_id))
-            conn.commit()
+        deleted = await self.adb.delete_alias(alias_id, user_id)
+
+        if deleted > 0:
+            await update.message.reply_text(f"✅ Alias ID `{alias_id}` deleted", parse_mode=ParseMode.MARKDOWN)
+        else:
+            await update.message.reply_text("❌ Alias not found or no permission")
 
-            if cursor.rowcount > 0:
-                await update.message.reply_text(f"✅ Alias ID `{alias_id}` deleted", parse_mode=ParseMode.MARKDOWN)
+    @staticmethod
+    def parse_export_args(args: List[str]) -> Tuple[Sequence[str], Optional[str], Optional[str], bool]:
+        """
+        Parse `/export [gzip] [columns=a,b] [from=YYYY-MM-DD] [to=YYYY-MM-DD]`.
+        
+        Returns (columns, since, until, compress); `to` is inclusive and is
+        turned into an exclusive bound on the following day.
+        """
+        columns: Sequence[str] = DEFAULT_EXPORT_COLUMNS
+        since = until = None
+        compress = False
+        for arg in args:
+            key, _, value = arg.partition('=')
+            key = key.lower()
+            if key in ('gzip', 'gz') and not value:
+                compress = True
+            elif key == 'columns' and value:
+                columns = [column.strip().lower() for column in value.split(',') if column.strip()]
+                unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+                if unknown or not columns:
+                    raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+            elif key in ('from', 'to') and value:
+                day = datetime.strptime(value, '%Y-%m-%d')
+                if key == 'from':
+                    since = day.strftime('%Y-%m-%d')
+                else:
+                    until = (day + timedelta(days=1)).strftime('%Y-%m-%d')
             else:
-                await update.message.reply_text("❌ Alias not found or no permission")
+                raise ValueError(f"Unknown option: {arg}")
+        return columns, since, until, compress
+
+    async def _build_export(self, user_id: int, columns: Sequence[str], since: Optional[str],
+                            until: Optional[str], compress: bool) -> Tuple[int, bytes]:
+        """
+        Write the CSV into a spooled temp file, gzipped on the fly if asked.
+        
+        Every keyset page is its own call on the DB worker, so other users'
+        queries run between pages; CSV writing and compression happen in a
+        separate thread rather than on the worker or the event loop.
+        """
+        with tempfile.SpooledTemporaryFile(max_size=Config.DOCUMENT_SPOOL_MAX_MEMORY) as spool:
+            raw = gzip.GzipFile(fileobj=spool, mode='wb', mtime=0) if compress else spool
+            text_stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            writer = csv.writer(text_stream)
+            writer.writerow(columns)
+            
+            count = 0
+            after = None
+            while True:
+                page, after = await self.adb.export_page(
+                    user_id, columns, since, until, after, Config.EXPORT_PAGE_SIZE
+                )
+                if page:
+                    await asyncio.to_thread(writer.writerows, page)
+                    count += len(page)
+                if after is None:
+                    break
+            
+            def finish() -> bytes:
+                text_stream.flush()
+                text_stream.detach()
+                if compress:
+                    raw.close()
+                spool.seek(0)
+                # The Bot API upload needs the bytes anyway
+                return spool.read()
+            
+            return count, await asyncio.to_thread(finish)
 
     async def export_aliases(self, update: Update, context: CallbackContext):
         user_id = update.effective_user.id
         
-        if not self.check_terms_accepted(user_id):
+        if not await self.check_terms_accepted(user_id):
             await update.message.reply_text("❌ Please accept the Terms & Conditions first using /start")
             return
         
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT alias, id, created_at, base_email 
-                FROM aliases 
-                WHERE user_id = ?
-                ORDER BY created_at DESC
-            ''', (user_id,))
-            aliases = cursor.fetchall()
+        try:
+            columns, since, until, compress = self.parse_export_args(context.args or [])
+        except ValueError as e:
+            await update.message.reply_text(
+                f"❌ `{e}`\n\nUsage: `/export [gzip] [columns=alias,created_at] [from=2024-01-01] [to=2024-12-31]`\n"
+                f"Columns: `{', '.join(EXPORT_COLUMNS)}`",
+                parse_mode=ParseMode.MARKDOWN
+            )
+            return
+        
+        count, content = await self._build_export(user_id, columns, since, until, compress)
 
-        if not aliases:
+        if not count:
             await update.message.reply_text("📭 No aliases to export")
             return
 
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['alias', 'id', 'created_at', 'base_email'])
-        
-        for alias in aliases:
-            escaped_alias = [str(field).replace('"', '""') for field in alias]
-            writer.writerow(escaped_alias)
-
-        output.seek(0)
-        csv_content = output.getvalue().encode('utf-8')
-        
+        filename = f"aliases_export_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
         await context.bot.send_document(
             chat_id=update.effective_chat.id,
-            document=csv_content,
-            filename=f"aliases_export_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-            caption="📤 Your aliases export"
+            document=content,
+            filename=f"{filename}.gz" if compress else filename,
+            caption=f"📤 Your aliases export ({count} rows)",
+            rate_limit_args=BULK
         )
 
     async def enable_catchall(self, update: Update, context: CallbackContext):
         user_id = update.effective_user.id
         
-        if not self.check_terms_accepted(user_id):
+        if not await self.check_terms_accepted(user_id):
             await update.message.reply_text("❌ Please accept the Terms & Conditions first using /start")
             return
         
-        user_settings = self.get_user_settings(user_id)
+        user_settings = await self.get_user_settings(user_id)
         if not user_settings:
             await update.message.reply_text("❌ Please set your base email first using `/set`")
             return
@@ -732,11 +970,7 @@ Use `/enable_catchall` first and ensure you have catch-all configured on your do
         base_email, current_catchall = user_settings
         new_catchall = not current_catchall
 
-        with self.db.get_connection() as conn:
-            conn.execute('''
-                UPDATE usersettings SET catch_all = ? WHERE user_id = ?
-            ''', (int(new_catchall), user_id))
-            conn.commit()
+        await self.adb.set_catch_all(user_id, new_catchall)
 
         if new_catchall:
             message = f"""
@@ -760,10 +994,11 @@ You can now generate custom aliases:
         self.start_time = datetime.now()
         
         self.application.add_handler(CallbackQueryHandler(self.generate_callback, pattern='^generate_'))
+        self.application.add_handler(CallbackQueryHandler(self.list_callback, pattern='^list_'))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_generation_number))
         
-        self.application.run_polling()
-        logger.info("Bot started and polling...")
+        logger.info(f"Bot starting ({describe_mode()})...")
+        run_application(self.application)
 
 def main():
     if not Config.BOT_TOKEN: